@@ -1,7 +1,67 @@
-from .dynamixel_connector import DynamixelConnector, FieldReadFuture, FieldWriteFuture, DynamixelFuture, \
-    DynamixelError, DynamixelConnectionError, DynamixelCommunicationError, DynamixelPacketError
-from .rhp12rn_connector import RHP12RNConnector, RHP12RN_FIELDS, RHP12RN_RAM_FIELDS, RHP12RN_EEPROM_FIELDS
-from .rhp12rna_connector import RHP12RNAConnector, RHP12RNA_FIELDS, RHP12RNA_RAM_FIELDS, RHP12RNA_EEPROM_FIELDS
-from .rhp12rn import RHP12RN
-from .rhp12rna_interface import RHP12RNAInterface
-from .util import find_grippers
+import importlib
+
+# Submodules are only imported when one of their attributes is accessed for the first time, such that importing this
+# package does not pull in dynamixel_sdk, numpy or the control tables of both gripper models
+_EXPORTS = {
+    "DynamixelConnector": ".dynamixel_connector",
+    "FieldReadFuture": ".dynamixel_connector",
+    "FieldWriteFuture": ".dynamixel_connector",
+    "BlockReadFuture": ".dynamixel_connector",
+    "DynamixelFuture": ".dynamixel_connector",
+    "DynamixelError": ".dynamixel_connector",
+    "DynamixelConnectionError": ".dynamixel_connector",
+    "DynamixelCommunicationError": ".dynamixel_connector",
+    "DynamixelPacketError": ".dynamixel_connector",
+    "RetryPolicy": ".dynamixel_connector",
+    "RetryMetrics": ".dynamixel_connector",
+    "RHP12RNConnector": ".rhp12rn_connector",
+    "RHP12RN_FIELDS": ".rhp12rn_connector",
+    "RHP12RN_RAM_FIELDS": ".rhp12rn_connector",
+    "RHP12RN_EEPROM_FIELDS": ".rhp12rn_connector",
+    "RHP12RNAConnector": ".rhp12rna_connector",
+    "RHP12RNA_FIELDS": ".rhp12rna_connector",
+    "RHP12RNA_RAM_FIELDS": ".rhp12rna_connector",
+    "RHP12RNA_EEPROM_FIELDS": ".rhp12rna_connector",
+    "RHP12RN": ".rhp12rn",
+    "SelectPortHandler": ".select_port_handler",
+    "TraceRecorder": ".tracing",
+    "DeviceClock": ".clock_sync",
+    "export_chrome_trace": ".tracing",
+    "AdaptivePoller": ".poller",
+    "GripperEvents": ".events",
+    "TrajectoryPlayer": ".trajectory",
+    "MultiGripperCoordinator": ".coordinator",
+    "TelemetryMonitor": ".monitor",
+    "ScheduledConnector": ".scheduler",
+    "Units": ".units",
+    "MultiRateReader": ".field_groups",
+    "PriorityLock": ".scheduler",
+    "SharedMemoryStateServer": ".shared_memory_server",
+    "SharedMemoryClient": ".shared_memory_server",
+    "GripperServer": ".socket_server",
+    "GripperClient": ".socket_server",
+    "GripperConfiguration": ".configuration",
+    "apply_configuration": ".configuration",
+    "RHP12RNAInterface": ".rhp12rna_interface",
+    "find_grippers": ".util",
+    "negotiate_baud_rate": ".util",
+    "verified_baud_rate": ".util",
+    "discover_gripper": ".util",
+    "cached_gripper": ".util",
+    "DiscoveredGripper": ".util",
+    "adapter_key": ".util",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,139 @@
+"""
+MIT License
+
+Copyright (c) 2021 Tim Schneider
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from collections import deque
+from typing import Optional
+
+# The realtime tick of the RH-P12-RN(A) counts milliseconds from 0 to 32767 and then wraps around
+REALTIME_TICK_PERIOD = 32768
+
+
+class DeviceClock:
+    """
+    Estimates the offset and drift between the millisecond tick of the gripper (realtime_tick) and the host monotonic
+    clock, such that samples can be stamped with the host time at which the gripper acquired them.
+
+    Each sample was acquired after the request was sent and before the reply was received, and the tick only has a
+    resolution of one millisecond. Hence every sample bounds the clock offset from both sides. The drift is fitted by
+    least squares over all samples and the offset is the center of the intersection of the bounds of the most recent
+    samples, which excludes the (one-sided) USB latency jitter instead of averaging over it.
+    """
+
+    def __init__(self, tick_period: int = REALTIME_TICK_PERIOD, window: int = 100, min_drift_span: float = 1.0):
+        """
+        :param tick_period: Number of ticks after which the tick wraps around.
+        :param window: Number of recent samples whose bounds are intersected to determine the offset.
+        :param min_drift_span: Minimum time span in seconds covered by the samples before the drift is estimated.
+        """
+        self.__tick_period = tick_period
+        self.__min_drift_span = min_drift_span
+        self.__bounds = deque(maxlen=window)
+        self.reset()
+
+    def reset(self):
+        self.__last_tick: Optional[int] = None
+        self.__last_receive_time = 0.0
+        self.__device_ms = 0
+        self.__host_origin = 0.0
+        self.__device_origin = 0
+        self.__samples = 0
+        self.__sum_x = self.__sum_y = self.__sum_xx = self.__sum_xy = 0.0
+        self.__rate = 1.0
+        self.__offset = 0.0
+        self.__bounds.clear()
+
+    def __unwrap(self, tick: int, receive_time: float) -> int:
+        if self.__last_tick is None:
+            self.__device_ms = tick
+        else:
+            delta = (tick - self.__last_tick) % self.__tick_period
+            # if the tick was not sampled for longer than a period, the number of wraps follows from the host clock
+            elapsed_ms = (receive_time - self.__last_receive_time) * 1000
+            wraps = max(0, round((elapsed_ms - delta) / self.__tick_period))
+            self.__device_ms += delta + wraps * self.__tick_period
+        self.__last_tick = tick
+        self.__last_receive_time = receive_time
+        return self.__device_ms
+
+    def update(self, tick: int, send_time: float, receive_time: float) -> float:
+        """
+        Adds a sample and returns its estimated acquisition time.
+        :param tick: Value of realtime_tick.
+        :param send_time: Host time (time.monotonic) right before the request was sent.
+        :param receive_time: Host time (time.monotonic) right after the reply was received.
+        :return: Estimated host time (time.monotonic) at which the gripper acquired the sample.
+        """
+        device_ms = self.__unwrap(tick, receive_time)
+        if self.__samples == 0:
+            self.__host_origin = send_time
+            self.__device_origin = device_ms
+        # the regression is done relative to the first sample to preserve floating point precision
+        x = (device_ms - self.__device_origin) / 1000
+        y = (send_time + receive_time) / 2 - self.__host_origin
+        self.__samples += 1
+        self.__sum_x += x
+        self.__sum_y += y
+        self.__sum_xx += x * x
+        self.__sum_xy += x * y
+        sxx = self.__sum_xx - self.__sum_x * self.__sum_x / self.__samples
+        # the variance of samples spread uniformly over a time span T is T^2 / 12
+        if sxx / self.__samples > self.__min_drift_span ** 2 / 12:
+            self.__rate = (self.__sum_xy - self.__sum_x * self.__sum_y / self.__samples) / sxx
+
+        # the tick is truncated, hence the sample was acquired within the millisecond following the tick
+        self.__bounds.append((x, send_time - self.__host_origin, receive_time - self.__host_origin))
+        rate = self.__rate
+        lower = max(send - rate * (x + 0.001) for x, send, _ in self.__bounds)
+        upper = min(receive - rate * x for x, _, receive in self.__bounds)
+        if lower <= upper:
+            self.__offset = (lower + upper) / 2
+        else:
+            # the bounds contradict each other while the drift estimate is still inaccurate
+            self.__offset = (self.__sum_y - rate * self.__sum_x) / self.__samples
+        # the sample was certainly acquired while the request was in flight
+        return min(max(self.to_host_time(device_ms), send_time), receive_time)
+
+    def to_host_time(self, device_ms: float) -> float:
+        """
+        Converts an unwrapped device time in milliseconds into host time (time.monotonic).
+        """
+        return self.__host_origin + self.__offset + self.__rate * (device_ms - self.__device_origin + 0.5) / 1000
+
+    @property
+    def device_ms(self) -> int:
+        """
+        Unwrapped device time of the most recent sample in milliseconds.
+        """
+        return self.__device_ms
+
+    @property
+    def drift_ppm(self) -> float:
+        """
+        Estimated drift of the device clock relative to the host clock in parts per million.
+        """
+        return (1.0 / self.__rate - 1.0) * 1e6
+
+    @property
+    def samples(self) -> int:
+        return self.__samples
@@ -0,0 +1,81 @@
+"""
+MIT License
+
+Copyright (c) 2021 Tim Schneider
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from typing import NamedTuple, Optional, Dict, Sequence
+
+from .dynamixel_connector import DynamixelConnector
+
+# Values of the operating_mode field
+CURRENT_CONTROL_MODE = 0
+POSITION_CONTROL_MODE = 5
+
+# Attributes of GripperConfiguration whose name differs from the name of the corresponding field
+_FIELD_NAMES = {
+    "position_limit_low": "min_position_limit",
+    "position_limit_high": "max_position_limit",
+    "torque_enabled": "torque_enable"
+}
+
+
+class GripperConfiguration(NamedTuple):
+    """
+    Desired configuration of a gripper. Attributes that are None are left unchanged when the configuration is applied.
+    """
+    operating_mode: Optional[int] = None
+    position_limit_low: Optional[int] = None
+    position_limit_high: Optional[int] = None
+    velocity_limit: Optional[int] = None
+    acceleration_limit: Optional[int] = None
+    current_limit: Optional[int] = None
+    position_p_gain: Optional[int] = None
+    position_i_gain: Optional[int] = None
+    position_d_gain: Optional[int] = None
+    profile_velocity: Optional[int] = None
+    profile_acceleration: Optional[int] = None
+    goal_current: Optional[int] = None
+    torque_enabled: Optional[bool] = None
+
+    def field_values(self) -> Dict[str, int]:
+        """
+        :return: Dictionary mapping the names of the configured fields to their desired values.
+        """
+        return {_FIELD_NAMES.get(k, k): int(v) for k, v in self._asdict().items() if v is not None}
+
+
+def apply_configuration(connector: DynamixelConnector, configuration: GripperConfiguration,
+                        extra_fields: Sequence[str] = ()) -> Dict[str, int]:
+    """
+    Applies a configuration with a single block read and a diff: only fields that differ from the desired configuration
+    are written and torque is only disabled if EEPROM fields have to be changed. If the gripper is configured already,
+    applying the configuration takes a single round trip and does not wear the EEPROM.
+    :param connector: Connected connector of the gripper.
+    :param configuration: Desired configuration.
+    :param extra_fields: Additional fields to read along with the configured fields, e.g. to obtain the position limits
+                         without another round trip.
+    :return: Values of the configured fields, torque_enable and the extra fields after applying the configuration.
+    """
+    values = configuration.field_values()
+    current = connector.read_fields(list(set(values) | {"torque_enable"} | set(extra_fields)))
+    current.update(connector.write_changed_fields(values, current))
+    return current
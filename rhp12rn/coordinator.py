@@ -0,0 +1,147 @@
+"""
+MIT License
+
+Copyright (c) 2021 Tim Schneider
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import threading
+import time
+from typing import Dict, Mapping, Optional, Sequence
+
+from .dynamixel_connector import DynamixelConnector
+from .poller import DEFAULT_STATUS_FIELDS
+
+
+class _Worker:
+    def __init__(self, connector: DynamixelConnector, status_fields: Sequence[str]):
+        self.connector = connector
+        self.status_fields = list(status_fields)
+        self.commands: Mapping[str, int] = {}
+        self.status: Dict[str, int] = {}
+        self.send_time = 0.0
+        self.error: Optional[BaseException] = None
+
+    def cycle(self):
+        self.error = None
+        try:
+            self.send_time = time.perf_counter()
+            futures = [self.connector.write_field_async(f, v) for f, v in self.commands.items()]
+            for future in futures:
+                future.result()
+            if len(self.status_fields) > 0:
+                self.status = self.connector.read_fields(self.status_fields)
+        except BaseException as e:
+            self.error = e
+
+
+class MultiGripperCoordinator:
+    """
+    Drives several grippers, each on its own serial adapter, from one I/O thread per adapter. In each cycle, all threads
+    are released at the same time to send their commands and read the status, such that the commands reach the
+    grippers within a small skew and a cycle takes as long as the slowest gripper instead of the sum of all of them.
+    Since blocking reads of the PortHandler busy-wait while holding the GIL, connectors using the SelectPortHandler
+    parallelize considerably better.
+    """
+
+    def __init__(self, connectors: Mapping[str, DynamixelConnector],
+                 status_fields: Optional[Mapping[str, Sequence[str]]] = None):
+        """
+        :param connectors: Connected connectors by gripper name. Each connector must be used by the coordinator only.
+        :param status_fields: Fields read in every cycle by gripper name. Defaults to all fields of
+                              DEFAULT_STATUS_FIELDS provided by the gripper model.
+        """
+        if status_fields is None:
+            status_fields = {}
+        self.__workers = {
+            name: _Worker(connector, status_fields.get(name, [f for f in DEFAULT_STATUS_FIELDS
+                                                               if f in connector.fields]))
+            for name, connector in connectors.items()}
+        # the coordinator itself is a party of both barriers
+        self.__start = threading.Barrier(len(self.__workers) + 1)
+        self.__end = threading.Barrier(len(self.__workers) + 1)
+        self.__threads = []
+        self.__last_skew = 0.0
+        self.__last_cycle_time = 0.0
+
+    def start(self):
+        for name, worker in self.__workers.items():
+            thread = threading.Thread(target=self.__run, args=(worker,), name="rhp12rn-{}".format(name), daemon=True)
+            thread.start()
+            self.__threads.append(thread)
+
+    def close(self):
+        self.__start.abort()
+        self.__end.abort()
+        for thread in self.__threads:
+            thread.join()
+        self.__threads = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __run(self, worker: _Worker):
+        try:
+            while True:
+                self.__start.wait()
+                worker.cycle()
+                self.__end.wait()
+        except threading.BrokenBarrierError:
+            pass
+
+    def cycle(self, commands: Optional[Mapping[str, Mapping[str, int]]] = None) -> Dict[str, Dict[str, int]]:
+        """
+        Sends the commands to all grippers in parallel and reads their status.
+        :param commands: Field values to write by gripper name. Grippers without commands only read their status.
+        :return: Combined status of all grippers by gripper name.
+        """
+        if commands is None:
+            commands = {}
+        for name, worker in self.__workers.items():
+            worker.commands = commands.get(name, {})
+        start = time.perf_counter()
+        self.__start.wait()
+        self.__end.wait()
+        self.__last_cycle_time = time.perf_counter() - start
+        send_times = [w.send_time for w in self.__workers.values()]
+        self.__last_skew = max(send_times) - min(send_times)
+        for worker in self.__workers.values():
+            if worker.error is not None:
+                raise worker.error
+        return {name: worker.status for name, worker in self.__workers.items()}
+
+    @property
+    def last_skew(self) -> float:
+        """
+        Time in seconds between the first and the last gripper starting to send its commands in the last cycle.
+        """
+        return self.__last_skew
+
+    @property
+    def last_cycle_time(self) -> float:
+        return self.__last_cycle_time
+
+    @property
+    def connectors(self) -> Dict[str, DynamixelConnector]:
+        return {name: worker.connector for name, worker in self.__workers.items()}
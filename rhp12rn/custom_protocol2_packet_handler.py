@@ -21,69 +21,345 @@ LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
+import os
+import struct
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
 from dynamixel_sdk import Protocol2PacketHandler, PortHandler, COMM_TX_FAIL, COMM_SUCCESS, COMM_RX_TIMEOUT, \
     COMM_RX_CORRUPT, DXL_MAKEWORD, PKT_RESERVED, PKT_ID, PKT_INSTRUCTION, PKT_LENGTH_L, PKT_LENGTH_H, RXPACKET_MAX_LEN, \
-    PKT_ERROR, PKT_PARAMETER0
+    PKT_ERROR, PKT_PARAMETER0, COMM_PORT_BUSY, COMM_TX_ERROR, TXPACKET_MAX_LEN, PKT_HEADER0, PKT_HEADER1, PKT_HEADER2, \
+    DXL_LOBYTE, DXL_HIBYTE, INST_READ
+
+from .tracing import TraceHook, TX_BUILD, TX_WRITE, FIRST_BYTE, PACKET_COMPLETE, CRC
+
+
+# Status packets are read in chunks of this size, which covers many pipelined replies
+RX_CHUNK_SIZE = 4096
+# HEADER0 HEADER1 HEADER2 RESERVED ID LENGTH_L LENGTH_H INST ERROR CRC16_L CRC16_H
+MIN_STATUS_PACKET_LENGTH = 11
+
+
+def _crc_tables() -> Tuple[Tuple[int, ...], Tuple[int, ...]]:
+    # CRC-16 with polynomial 0x8005 as used by protocol 2.0, split into high and low bytes
+    table = []
+    for i in range(256):
+        crc = i << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x8005 if crc & 0x8000 else crc << 1) & 0xFFFF
+        table.append(crc)
+    return tuple(c >> 8 for c in table), tuple(c & 0xFF for c in table)
+
+
+# Keeping the CRC as two bytes avoids creating int objects outside of CPython's small int cache
+_CRC_TABLE_HI, _CRC_TABLE_LO = _crc_tables()
+
+
+class TxTemplate:
+    """
+    Preallocated instruction packet. Read packets are constant, write packets only need the data bytes and the CRC to
+    be patched in place, which continues from the precomputed CRC of the bytes preceding the data.
+    """
+
+    def __init__(self, packet_handler: Protocol2PacketHandler, instruction: int, dxl_id: int, address: int, length: int,
+                 data_type: Optional[str] = None):
+        params = [DXL_LOBYTE(address), DXL_HIBYTE(address)]
+        if instruction == INST_READ:
+            params += [DXL_LOBYTE(length), DXL_HIBYTE(length)]
+        else:
+            params += [0] * length
+        packet = [0xFF, 0xFF, 0xFD, 0x00, dxl_id, DXL_LOBYTE(len(params) + 3), DXL_HIBYTE(len(params) + 3),
+                  instruction] + params + [0, 0]
+        if instruction == INST_READ:
+            packet_handler.addStuffing(packet)
+        self.packet = bytearray(packet)
+        self.view = memoryview(self.packet)
+        self.instruction = instruction
+        self.address = address
+        self.length = length
+        self.data_offset = PKT_PARAMETER0 + 2
+        self.data_end = self.data_offset + length
+        self.struct = struct.Struct("<" + data_type) if data_type is not None else None
+        prefix_length = len(self.packet) - 2 if instruction == INST_READ else self.data_offset
+        self.crc_hi, self.crc_lo = _continue_crc(self.packet, 0, prefix_length, 0, 0)
+        if instruction == INST_READ:
+            self.packet[-2], self.packet[-1] = self.crc_lo, self.crc_hi
+
+
+def _continue_crc(packet: bytearray, start: int, end: int, crc_hi: int, crc_lo: int) -> Tuple[int, int]:
+    i = start
+    while i < end:
+        index = crc_hi ^ packet[i]
+        crc_hi = crc_lo ^ _CRC_TABLE_HI[index]
+        crc_lo = _CRC_TABLE_LO[index]
+        i += 1
+    return crc_hi, crc_lo
 
 
 class CustomProtocol2PacketHandler(Protocol2PacketHandler):
     """
-    A packet handler that provides a blocking parameter for the rxPacket function.
+    A packet handler that provides a blocking parameter for the rxPacket function, buffers received bytes across
+    packets and sends instruction packets from preallocated templates.
     """
 
     def __init__(self):
-        self.__rx_buffer = []
+        self.__rx_buffer = bytearray()
+        self.__tracer: Optional[TraceHook] = None
+        self.__tx_templates: Dict[Tuple[int, int, int, int], TxTemplate] = {}
+        self.reset_counters()
         super(CustomProtocol2PacketHandler, self).__init__()
 
+    def clear_rx_buffer(self):
+        """
+        Discards received data that has not been parsed yet.
+        """
+        self.__rx_buffer.clear()
+
+    def reset_counters(self):
+        self.__packets_received = 0
+        self.__timeouts = 0
+        self.__corrupt_packets = 0
+        self.__resync_bytes = 0
+        self.__rx_reads = 0
+
+    def txPacket(self, port: PortHandler, txpacket: List[int]):
+        tracer = self.__tracer
+        if tracer is None:
+            return super(CustomProtocol2PacketHandler, self).txPacket(port, txpacket)
+
+        # same as Protocol2PacketHandler.txPacket, but reports the time spent building and writing the packet
+        start = time.perf_counter_ns()
+        if port.is_using:
+            return COMM_PORT_BUSY
+        port.is_using = True
+
+        self.addStuffing(txpacket)
+        total_packet_length = DXL_MAKEWORD(txpacket[PKT_LENGTH_L], txpacket[PKT_LENGTH_H]) + 7
+        if total_packet_length > TXPACKET_MAX_LEN:
+            port.is_using = False
+            return COMM_TX_ERROR
+
+        txpacket[PKT_HEADER0] = 0xFF
+        txpacket[PKT_HEADER1] = 0xFF
+        txpacket[PKT_HEADER2] = 0xFD
+        txpacket[PKT_RESERVED] = 0x00
+        crc = self.updateCRC(0, txpacket, total_packet_length - 2)
+        txpacket[total_packet_length - 2] = DXL_LOBYTE(crc)
+        txpacket[total_packet_length - 1] = DXL_HIBYTE(crc)
+        built = time.perf_counter_ns()
+        tracer(TX_BUILD, start, built)
+
+        port.clearPort()
+        written_packet_length = port.writePort(txpacket)
+        tracer(TX_WRITE, built, time.perf_counter_ns())
+        if total_packet_length != written_packet_length:
+            port.is_using = False
+            return COMM_TX_FAIL
+
+        return COMM_SUCCESS
+
+    def tx_template(self, instruction: int, dxl_id: int, address: int, length: int,
+                    data_type: Optional[str] = None) -> TxTemplate:
+        """
+        Returns the (cached) template of a read (INST_READ) or write (INST_WRITE) instruction. Callers on a hot path
+        should keep the template, as even the lookup allocates the key.
+        :param data_type: struct format of the value written by write_tx.
+        """
+        key = (instruction, dxl_id, address, length)
+        template = self.__tx_templates.get(key)
+        if template is None:
+            template = self.__tx_templates[key] = TxTemplate(self, instruction, dxl_id, address, length, data_type)
+        return template
+
+    def read_tx(self, port: PortHandler, template: TxTemplate) -> int:
+        """
+        Sends the read instruction of a template. Unlike readTx, no packet is built and the packet timeout is not set.
+        """
+        if port.is_using:
+            return COMM_PORT_BUSY
+        port.is_using = True
+        tracer = self.__tracer
+        if tracer is not None:
+            start = time.perf_counter_ns()
+            tracer(TX_BUILD, start, start)
+        return self.__write_template(port, template, tracer)
+
+    def write_tx(self, port: PortHandler, template: TxTemplate, value: int) -> int:
+        """
+        Patches the value and the CRC of a write template in place and sends it without waiting for the reply.
+        """
+        if port.is_using:
+            return COMM_PORT_BUSY
+        port.is_using = True
+        tracer = self.__tracer
+        start = time.perf_counter_ns() if tracer is not None else 0
+        packet = template.packet
+        template.struct.pack_into(packet, template.data_offset, value)
+        if packet.find(b"\xff\xff\xfd", template.data_offset - 2, template.data_end) >= 0:
+            # the data has to be stuffed, which changes the packet length, hence the generic implementation is used
+            port.is_using = False
+            return self.writeTxOnly(port, packet[PKT_ID], template.address, template.length,
+                                    list(packet[template.data_offset:template.data_end]))
+        crc_hi, crc_lo = _continue_crc(packet, template.data_offset, template.data_end, template.crc_hi,
+                                       template.crc_lo)
+        packet[template.data_end] = crc_lo
+        packet[template.data_end + 1] = crc_hi
+        if tracer is not None:
+            tracer(TX_BUILD, start, time.perf_counter_ns())
+        return self.__write_template(port, template, tracer)
+
+    def __write_template(self, port: PortHandler, template: TxTemplate, tracer: Optional[TraceHook]) -> int:
+        start = time.perf_counter_ns() if tracer is not None else 0
+        port.clearPort()
+        fd = getattr(port.ser, "fd", None)
+        try:
+            # writing to the file descriptor directly avoids the copy and the select call of Serial.write
+            written = os.write(fd, template.view) if fd is not None else 0
+        except BlockingIOError:
+            written = 0
+        if written < len(template.packet):
+            written += port.writePort(template.packet[written:])
+        if tracer is not None:
+            tracer(TX_WRITE, start, time.perf_counter_ns())
+        return COMM_SUCCESS if written == len(template.packet) else COMM_TX_FAIL
+
+    def __read_available(self, port: PortHandler) -> int:
+        # reads everything the driver has buffered with a single system call
+        self.__rx_reads += 1
+        fd = getattr(port.ser, "fd", None)
+        if fd is None:
+            data = port.readPort(RX_CHUNK_SIZE)
+        else:
+            try:
+                data = os.read(fd, RX_CHUNK_SIZE)
+            except BlockingIOError:
+                data = b""
+        if len(data) > 0:
+            if self.__tracer is not None and len(self.__rx_buffer) == 0:
+                now = time.perf_counter_ns()
+                self.__tracer(FIRST_BYTE, now, now)
+            self.__rx_buffer += data
+        return len(data)
+
+    def __parse(self):
+        """
+        Removes the first complete packet from the receive buffer.
+        :return: Tuple of the packet and the communication result, or the number of bytes missing for the next packet.
+        """
+        buffer = self.__rx_buffer
+        while True:
+            idx = buffer.find(b"\xff\xff\xfd\x00")
+            if idx < 0:
+                # keep a partially received header
+                drop = max(0, len(buffer) - 3)
+                del buffer[:drop]
+                self.__resync_bytes += drop
+                return MIN_STATUS_PACKET_LENGTH - len(buffer)
+            if idx > 0:
+                del buffer[:idx]
+                self.__resync_bytes += idx
+            if len(buffer) < MIN_STATUS_PACKET_LENGTH:
+                return MIN_STATUS_PACKET_LENGTH - len(buffer)
+            packet_len_header = DXL_MAKEWORD(buffer[PKT_LENGTH_L], buffer[PKT_LENGTH_H])
+            if buffer[PKT_ID] > 0xFC or packet_len_header > RXPACKET_MAX_LEN or buffer[PKT_INSTRUCTION] != 0x55:
+                # not a status packet, search for the next header
+                del buffer[:1]
+                self.__resync_bytes += 1
+                continue
+            packet_length = packet_len_header + PKT_LENGTH_H + 1
+            if len(buffer) < packet_length:
+                following = self.__find_complete_packet(buffer, 1)
+                if following < 0:
+                    return packet_length - len(buffer)
+                # byte stuffing prevents a header inside a packet, hence the length of this packet is corrupted and
+                # it is dropped instead of waiting for bytes that belong to the following packets
+                packet = list(buffer[:following])
+                del buffer[:following]
+                return packet, COMM_RX_CORRUPT
+
+            tracer = self.__tracer
+            if tracer is not None:
+                complete = time.perf_counter_ns()
+                tracer(PACKET_COMPLETE, complete, complete)
+            crc_hi, crc_lo = _continue_crc(buffer, 0, packet_length - 2, 0, 0)
+            if buffer[packet_length - 2] == crc_lo and buffer[packet_length - 1] == crc_hi:
+                packet = list(buffer[:packet_length])
+                del buffer[:packet_length]
+                result = COMM_SUCCESS
+            else:
+                # the length might be corrupted as well, hence only the header is dropped to find the next packet
+                packet = list(buffer[:packet_length])
+                del buffer[:3]
+                result = COMM_RX_CORRUPT
+            if tracer is not None:
+                tracer(CRC, complete, time.perf_counter_ns())
+            return packet, result
+
+    @staticmethod
+    def __find_complete_packet(buffer: bytearray, start: int) -> int:
+        """
+        :return: Index of the first complete status packet with a valid CRC starting at or after start, or -1.
+        """
+        idx = buffer.find(b"\xff\xff\xfd\x00", start)
+        while 0 <= idx <= len(buffer) - MIN_STATUS_PACKET_LENGTH:
+            packet_length = DXL_MAKEWORD(buffer[idx + PKT_LENGTH_L], buffer[idx + PKT_LENGTH_H]) + PKT_LENGTH_H + 1
+            end = idx + packet_length
+            if buffer[idx + PKT_INSTRUCTION] == 0x55 and end <= len(buffer):
+                crc_hi, crc_lo = _continue_crc(buffer, idx, end - 2, 0, 0)
+                if buffer[end - 2] == crc_lo and buffer[end - 1] == crc_hi:
+                    return idx
+            idx = buffer.find(b"\xff\xff\xfd\x00", idx + 1)
+        return -1
+
+    def __count(self, result: int):
+        if result == COMM_SUCCESS:
+            self.__packets_received += 1
+        elif result == COMM_RX_TIMEOUT:
+            self.__timeouts += 1
+        else:
+            self.__corrupt_packets += 1
+
     def rxPacket(self, port: PortHandler, blocking: bool = True):
-        result = None
-        # minimum length (HEADER0 HEADER1 HEADER2 RESERVED ID LENGTH_L LENGTH_H INST ERROR CRC16_L CRC16_H)
-        wait_length = 11
-
-        while result is None:
-            read_len = wait_length - len(self.__rx_buffer)
-            new_data = port.readPort(read_len)
-            self.__rx_buffer.extend(new_data)
-            if len(new_data) <= read_len and not blocking:
+        # Bytes following the packet (e.g. the replies to pipelined instructions) are kept in the receive buffer, such
+        # that consecutive packets are usually parsed without any further system call
+        while True:
+            parsed = self.__parse()
+            if not isinstance(parsed, int):
+                rx_packet, result = parsed
+                break
+            if self.__read_available(port) > 0:
+                continue
+            if not blocking:
                 raise BlockingIOError("Packet not received completely yet.")
-            if len(self.__rx_buffer) >= wait_length:
-                # find packet header
-                idx = 0
-                while idx < len(self.__rx_buffer) - 3 and \
-                        (self.__rx_buffer[idx:idx + 3] != [0xFF, 0xFF, 0xFD] or self.__rx_buffer[idx + 3] == 0xFD):
-                    idx += 1
-
-                if idx == 0:
-                    packet_len_header = DXL_MAKEWORD(self.__rx_buffer[PKT_LENGTH_L], self.__rx_buffer[PKT_LENGTH_H])
-                    if self.__rx_buffer[PKT_RESERVED] != 0x00 or self.__rx_buffer[PKT_ID] > 0xFC or \
-                            packet_len_header > RXPACKET_MAX_LEN or self.__rx_buffer[PKT_INSTRUCTION] != 0x55:
-                        # remove the first byte in the packet
-                        self.__rx_buffer[:1] = []
-                    elif wait_length != packet_len_header + PKT_LENGTH_H + 1:
-                        wait_length = packet_len_header + PKT_LENGTH_H + 1
-                    elif len(self.__rx_buffer) < wait_length:
-                        if port.isPacketTimeout():
-                            result = COMM_RX_TIMEOUT if len(self.__rx_buffer) == 0 else COMM_RX_CORRUPT
-                    else:
-                        crc = DXL_MAKEWORD(self.__rx_buffer[wait_length - 2], self.__rx_buffer[wait_length - 1])
-                        computed_crc = self.updateCRC(0, self.__rx_buffer, wait_length - 2)
-                        result = COMM_SUCCESS if computed_crc == crc else COMM_RX_CORRUPT
-                else:
-                    # remove unnecessary bytes
-                    self.__rx_buffer[:idx] = []
-            else:
-                if port.isPacketTimeout():
-                    result = COMM_RX_TIMEOUT if len(self.__rx_buffer) == 0 else COMM_RX_CORRUPT
+            if port.isPacketTimeout():
+                result = COMM_RX_TIMEOUT if len(self.__rx_buffer) == 0 else COMM_RX_CORRUPT
+                rx_packet = list(self.__rx_buffer)
+                self.__rx_buffer.clear()
+                break
+            if hasattr(port, "waitReadable"):
+                # sleep until data arrives instead of polling the port
+                port.waitReadable(parsed)
 
         port.is_using = False
-
-        rx_packet = self.__rx_buffer
-        self.__rx_buffer = []
+        self.__count(result)
         if result == COMM_SUCCESS:
             rx_packet = self.removeStuffing(rx_packet)
-
         return rx_packet, result
 
+    def read_packets(self, port: PortHandler) -> Iterator[Tuple[List[int], int]]:
+        """
+        Reads whatever is available and yields every complete packet in the receive buffer together with its
+        communication result (COMM_SUCCESS or COMM_RX_CORRUPT). Never blocks.
+        """
+        self.__read_available(port)
+        while True:
+            parsed = self.__parse()
+            if isinstance(parsed, int):
+                return
+            rx_packet, result = parsed
+            self.__count(result)
+            yield (self.removeStuffing(rx_packet) if result == COMM_SUCCESS else rx_packet), result
+
     def readRx(self, port: PortHandler, dxl_id: int, length: int, blocking: bool = True):
         error = 0
         data = []
@@ -98,3 +374,37 @@ class CustomProtocol2PacketHandler(Protocol2PacketHandler):
             data.extend(rxpacket[PKT_PARAMETER0 + 1: PKT_PARAMETER0 + 1 + length])
 
         return data, result, error
+
+    @property
+    def tracer(self) -> Optional[TraceHook]:
+        return self.__tracer
+
+    @tracer.setter
+    def tracer(self, value: Optional[TraceHook]):
+        self.__tracer = value
+
+    @property
+    def packets_received(self) -> int:
+        return self.__packets_received
+
+    @property
+    def timeouts(self) -> int:
+        return self.__timeouts
+
+    @property
+    def corrupt_packets(self) -> int:
+        return self.__corrupt_packets
+
+    @property
+    def rx_reads(self) -> int:
+        """
+        Number of read system calls issued while receiving packets.
+        """
+        return self.__rx_reads
+
+    @property
+    def resync_bytes(self) -> int:
+        """
+        Number of received bytes that were dropped while searching for a valid packet header.
+        """
+        return self.__resync_bytes
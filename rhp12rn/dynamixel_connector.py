@@ -26,17 +26,53 @@ import struct
 import time
 from abc import abstractmethod
 from collections import deque
-from typing import Optional, NamedTuple, Dict, Sequence
+from typing import Optional, NamedTuple, Dict, Sequence, Type, List, Tuple
 
-from dynamixel_sdk import PortHandler, PacketHandler, COMM_SUCCESS, PKT_ID, PKT_ERROR, GroupSyncRead
+from dynamixel_sdk import PortHandler, PacketHandler, COMM_SUCCESS, COMM_RX_FAIL, PKT_ID, PKT_ERROR, GroupSyncRead, \
+    INST_READ, INST_WRITE, INST_REG_WRITE, INST_ACTION, BROADCAST_ID, PKT_LENGTH_L, PKT_LENGTH_H, PKT_INSTRUCTION
 
-from .custom_protocol2_packet_handler import CustomProtocol2PacketHandler
+from .custom_protocol2_packet_handler import CustomProtocol2PacketHandler, TxTemplate, MIN_STATUS_PACKET_LENGTH
+from .clock_sync import DeviceClock
+from .tracing import TraceHook, TX_WAIT, DECODE, RESOLVE, RESULT_WAIT
 
 Field = NamedTuple("Field", (
     ("address", int), ("data_type", str), ("name", str), ("desc", str), ("writable", bool),
     ("initial_value", Optional[int])))
 
 
+# Maximum number of bytes requested by a single read instruction. Status packets are limited to RXPACKET_MAX_LEN bytes
+# including byte stuffing, which leaves a margin for a few stuffed bytes.
+MAX_BLOCK_READ_LENGTH = 1000
+
+# Fraction of the packet timeout that the transmission of a status packet may take up. The remainder covers the latency
+# of the USB serial driver and the return delay of the gripper.
+BLOCK_READ_TIMEOUT_FRACTION = 0.5
+
+# Replies of pipelined instructions are left in the receive buffer of the serial driver until their result is needed,
+# unless they would take up more than this number of bytes
+MAX_PENDING_REPLY_BYTES = 2048
+
+# Fields contained in the status returned by DynamixelConnector.group_read
+GROUP_READ_FIELDS = ("realtime_tick", "moving", "moving_status", "present_pwm", "present_current", "present_velocity",
+                     "present_position")
+
+
+def group_read_result(values: Dict[str, int]) -> Dict[str, int]:
+    """
+    Converts the raw values of GROUP_READ_FIELDS into the status format returned by DynamixelConnector.group_read.
+    """
+    present_current = values["present_current"]
+    present_velocity = values["present_velocity"]
+    # convert current to signed int cf. https://github.com/ROBOTIS-GIT/DynamixelSDK/issues/264
+    if present_current > 0x7fff:
+        present_current = present_current - 65536
+    if present_velocity > 0x7fffffff:
+        present_velocity = present_velocity - 4294967296
+    return {'real_time_tick': values["realtime_tick"], 'moving': values["moving"], 'present_current': present_current,
+            'moving_status': values["moving_status"], 'present_pwm': values["present_pwm"],
+            'present_velocity': present_velocity, 'present_position': values["present_position"]}
+
+
 # TODO: properly implement bulk reading
 
 class DynamixelError(Exception):
@@ -84,99 +120,327 @@ class DynamixelFuture:
     def result(self):
         pass
 
+    @abstractmethod
+    def _abort(self):
+        pass
+
+    def _wait(self):
+        tracer = self._packet_handler.tracer
+        if tracer is None:
+            self._connector.process_futures(stop_on=self)
+        else:
+            start = time.perf_counter_ns()
+            self._connector.process_futures(stop_on=self)
+            tracer(RESULT_WAIT, start, time.perf_counter_ns())
+
 
 class FieldReadFuture(DynamixelFuture):
     def __init__(self, field: Field, connector: "DynamixelConnector", packet_handler: CustomProtocol2PacketHandler,
-                 port_handler: PortHandler):
+                 port_handler: PortHandler, dynamixel_id: Optional[int] = None):
         super(FieldReadFuture, self).__init__(connector, packet_handler, port_handler)
         self.__field = field
+        # ID of the replying device if it is not the device of the connector
+        self.__dynamixel_id = dynamixel_id
         self.__data = self.__comm_result = self.__error = None
         self.__read = False
 
     def _read(self, blocking: bool):
         assert not self.__read
-        self._port_handler.setPacketTimeoutMillis(100)
+        tracer = self._packet_handler.tracer
+        self._port_handler.setPacketTimeoutMillis(self._connector.packet_timeout_ms)
         try:
+            dxl_id = self._connector.dynamixel_id if self.__dynamixel_id is None else self.__dynamixel_id
             data_raw, self.__comm_result, self.__error = self._packet_handler.readRx(
-                self._port_handler, self._connector.dynamixel_id, struct.calcsize(self.__field.data_type), blocking)
+                self._port_handler, dxl_id, struct.calcsize(self.__field.data_type), blocking)
             if self.__comm_result == 0 and self.__error == 0:
-                self.__data = struct.unpack("<{}".format(self.__field.data_type), bytes(data_raw))[0]
+                if tracer is None:
+                    self.__data = struct.unpack("<{}".format(self.__field.data_type), bytes(data_raw))[0]
+                else:
+                    start = time.perf_counter_ns()
+                    self.__data = struct.unpack("<{}".format(self.__field.data_type), bytes(data_raw))[0]
+                    tracer(DECODE, start, time.perf_counter_ns())
             self.__read = True
+            if tracer is not None:
+                now = time.perf_counter_ns()
+                tracer(RESOLVE, now, now)
         except BlockingIOError:
             pass
         return self.__read
 
     def result(self):
         if not self.__read:
-            self._connector.process_futures(stop_on=self)
+            self._wait()
+        if self.__comm_result != 0:
+            raise DynamixelCommunicationError(self.__comm_result, self._packet_handler, "reading")
+        elif self.__error != 0:
+            raise DynamixelPacketError(self.__error, self._packet_handler, "reading")
+        return self.__data
+
+    def _abort(self):
+        # Called if the reply will never be read, e.g. because the connector recovered from a communication error
+        if not self.__read:
+            self.__comm_result = COMM_RX_FAIL
+            self.__read = True
+
+
+class BlockReadFuture(DynamixelFuture):
+    def __init__(self, fields: Sequence[Field], address: int, length: int, connector: "DynamixelConnector",
+                 packet_handler: CustomProtocol2PacketHandler, port_handler: PortHandler):
+        super(BlockReadFuture, self).__init__(connector, packet_handler, port_handler)
+        self.__fields = fields
+        self.__address = address
+        self.__length = length
+        self.__data = self.__comm_result = self.__error = None
+        self.__read = False
+
+    def _read(self, blocking: bool):
+        assert not self.__read
+        tracer = self._packet_handler.tracer
+        self._port_handler.setPacketTimeoutMillis(self._connector.packet_timeout_ms)
+        try:
+            data_raw, self.__comm_result, self.__error = self._packet_handler.readRx(
+                self._port_handler, self._connector.dynamixel_id, self.__length, blocking)
+            if self.__comm_result == 0 and self.__error == 0:
+                start = time.perf_counter_ns() if tracer is not None else 0
+                data_raw = bytes(data_raw)
+                self.__data = {
+                    f.name: struct.unpack_from("<{}".format(f.data_type), data_raw, f.address - self.__address)[0]
+                    for f in self.__fields}
+                if tracer is not None:
+                    tracer(DECODE, start, time.perf_counter_ns())
+            self.__read = True
+            if tracer is not None:
+                now = time.perf_counter_ns()
+                tracer(RESOLVE, now, now)
+        except BlockingIOError:
+            pass
+        return self.__read
+
+    def result(self) -> Dict[str, int]:
+        if not self.__read:
+            self._wait()
         if self.__comm_result != 0:
             raise DynamixelCommunicationError(self.__comm_result, self._packet_handler, "reading")
         elif self.__error != 0:
             raise DynamixelPacketError(self.__error, self._packet_handler, "reading")
         return self.__data
 
+    def _abort(self):
+        # Called if the reply will never be read, e.g. because the connector recovered from a communication error
+        if not self.__read:
+            self.__comm_result = COMM_RX_FAIL
+            self.__read = True
+
 
 class FieldWriteFuture(DynamixelFuture):
-    def __init__(self, connector: "DynamixelConnector", packet_handler: PacketHandler, port_handler: PortHandler):
+    def __init__(self, connector: "DynamixelConnector", packet_handler: PacketHandler, port_handler: PortHandler,
+                 expects_reply: bool = True, dynamixel_id: Optional[int] = None):
         super(FieldWriteFuture, self).__init__(connector, packet_handler, port_handler)
-        self.__comm_result = self.__error = None
-        self.__read = False
+        self.__dynamixel_id = dynamixel_id
+        # If the gripper does not acknowledge writes (status return level < 2), the future is resolved right away
+        self.__comm_result = self.__error = None if expects_reply else 0
+        self.__read = not expects_reply
 
     def _read(self, blocking: bool):
         assert not self.__read
-        self._port_handler.setPacketTimeoutMillis(100)
+        tracer = self._packet_handler.tracer
+        self._port_handler.setPacketTimeoutMillis(self._connector.packet_timeout_ms)
+        dxl_id = self._connector.dynamixel_id if self.__dynamixel_id is None else self.__dynamixel_id
         try:
             while True:
                 rxpacket, result = self._packet_handler.rxPacket(self._port_handler, blocking=blocking)
-                if result != COMM_SUCCESS or self._connector.dynamixel_id == rxpacket[PKT_ID]:
+                if result != COMM_SUCCESS or dxl_id == rxpacket[PKT_ID]:
                     break
 
             self.__comm_result = result
             self.__error = rxpacket[PKT_ERROR] if result == COMM_SUCCESS else 0
             self.__read = True
+            if tracer is not None:
+                now = time.perf_counter_ns()
+                tracer(RESOLVE, now, now)
         except BlockingIOError:
             pass
         return self.__read
 
     def result(self):
         if not self.__read:
-            self._connector.process_futures(stop_on=self)
+            self._wait()
         if self.__comm_result != 0:
             raise DynamixelCommunicationError(self.__comm_result, self._packet_handler, "writing")
         elif self.__error != 0:
             raise DynamixelPacketError(self.__error, self._packet_handler, "writing")
 
+    def _abort(self):
+        # Called if the reply will never be read, e.g. because the connector recovered from a communication error
+        if not self.__read:
+            self.__comm_result = COMM_RX_FAIL
+            self.__read = True
+
+
+class RetryPolicy(NamedTuple):
+    """
+    Bounds the time spent on recovering from communication errors.
+    :param max_attempts: Maximum number of attempts per operation (including the first one).
+    :param deadline: Maximum time in s an operation may take including all retries. The packet timeout of each attempt
+                     is shortened such that the deadline is kept.
+    :param initial_backoff: Time in s to wait before the first retry. The wait time doubles with every retry.
+    :param max_backoff: Maximum time in s to wait between two retries.
+    :param reopen_on_disconnect: Whether to reopen the port if the USB connection got lost.
+    """
+    max_attempts: int = 3
+    deadline: float = 0.5
+    initial_backoff: float = 0.001
+    max_backoff: float = 0.05
+    reopen_on_disconnect: bool = True
+
+
+class RetryMetrics:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.__retries = 0
+        self.__reopens = 0
+        self.__recoveries = 0
+        self.__failures = 0
+        self.__max_recovery_time = 0.0
+        self.__total_recovery_time = 0.0
+
+    def _record_retry(self, reopened: bool):
+        self.__retries += 1
+        self.__reopens += int(reopened)
+
+    def _record_recovery(self, recovery_time: float):
+        self.__recoveries += 1
+        self.__max_recovery_time = max(self.__max_recovery_time, recovery_time)
+        self.__total_recovery_time += recovery_time
+
+    def _record_failure(self):
+        self.__failures += 1
+
+    @property
+    def retries(self) -> int:
+        return self.__retries
+
+    @property
+    def reopens(self) -> int:
+        return self.__reopens
+
+    @property
+    def recoveries(self) -> int:
+        """
+        Number of operations that succeeded after at least one retry.
+        """
+        return self.__recoveries
+
+    @property
+    def failures(self) -> int:
+        """
+        Number of operations that failed although retries were allowed.
+        """
+        return self.__failures
+
+    @property
+    def max_recovery_time(self) -> float:
+        return self.__max_recovery_time
+
+    @property
+    def mean_recovery_time(self) -> float:
+        return self.__total_recovery_time / max(1, self.__recoveries)
+
 
 class DynamixelConnector:
     def __init__(self, fields: Sequence[Field], device: str = "/dev/ttyUSB0", baud_rate: int = 57600,
-                 dynamixel_id: int = 1):
+                 dynamixel_id: int = 1, port_handler_type: Type[PortHandler] = PortHandler,
+                 retry_policy: Optional[RetryPolicy] = None):
+        """
+        :param fields: Control table of the device.
+        :param device: Device path of the serial port.
+        :param baud_rate: Baud rate of the device.
+        :param dynamixel_id: Dynamixel ID of the device.
+        :param port_handler_type: Port handler class to use. Pass SelectPortHandler to let blocking reads sleep on the
+                                  serial file descriptor instead of polling the port.
+        :param retry_policy: Default retry policy of read_field, read_fields and write_field. If None, errors are raised
+                             right away.
+        """
+        self.__retry_policy = retry_policy
+        self.__retry_metrics = RetryMetrics()
+        self.__packet_timeout_ms = 100
+        self.__should_be_connected = False
+        self.__port_handler_type = port_handler_type
         self.__baud_rate = baud_rate
         self.__dynamixel_id = dynamixel_id
         self.__device = device
         self.__port_handler: Optional[PortHandler] = None
         self.__packet_handler = CustomProtocol2PacketHandler()
         self.__field_dict = {f.name: f for f in fields}
+        # pending futures and the expected length of their replies
         self.__future_queue = deque()
+        self.__pending_reply_bytes = 0
+        # preallocated instruction packets by field name
+        self.__read_templates: Dict[str, TxTemplate] = {}
+        self.__write_templates: Dict[str, TxTemplate] = {}
         self.__last_tx = 0
         self.__tx_wait_time = 0.0001
         self.__checked_gripper_type = False
+        self.__groupSyncRead: Optional[GroupSyncRead] = None
+        self.__status_return_level = 2
+        self.__bus_watchdog_value = 0
+        self.__device_clock: Optional[DeviceClock] = None
 
     def connect(self):
+        self.__open_port()
+        self.__should_be_connected = True
+
+    def __open_port(self):
         if not self.connected:
-            self.__port_handler = PortHandler(self.__device)
+            self.__port_handler = self.__port_handler_type(self.__device)
+            # the group sync read is bound to the port handler, hence it is rebuilt for the new one by group_read
+            self.__groupSyncRead = None
             try:
                 if not self.__port_handler.openPort():
                     self.__port_handler = None
                     raise DynamixelConnectionError("Failed to open port.")
 
                 if not self.__port_handler.setBaudRate(self.__baud_rate):
-                    self.disconnect()
+                    self.__port_handler.closePort()
                     raise DynamixelConnectionError("Failed to set baud rate.")
+            except OSError as e:
+                self.__port_handler = None
+                raise DynamixelConnectionError("Failed to open port: {}".format(e))
             except Exception as e:
                 self.__port_handler = None
                 raise
 
+    def set_baud_rate(self, baud_rate: int, update_gripper: bool = True):
+        """
+        Changes the baud rate of the connection.
+        :param baud_rate: New baud rate.
+        :param update_gripper: Whether to write the new baud rate to the EEPROM of the gripper first. Note that torque
+                               has to be disabled for this to succeed. If False, only the port is reopened, e.g. to
+                               follow a gripper whose baud rate has been changed already.
+        """
+        if not self.connected:
+            raise DynamixelError("Controller is not connected.")
+        if not self.supports_baud_rate(baud_rate):
+            raise DynamixelConnectionError("Baud rate {} is not supported by the port handler.".format(baud_rate))
+        if update_gripper:
+            from .util import BAUD_RATE_FIELD_VALUES
+            if baud_rate not in BAUD_RATE_FIELD_VALUES:
+                raise DynamixelError("Baud rate {} is not supported by the gripper.".format(baud_rate))
+            self.process_futures()
+            # The gripper might already reply at the new baud rate, hence the acknowledgement is not awaited
+            self.__write_without_reply("baud_rate", BAUD_RATE_FIELD_VALUES[baud_rate])
+        if not self.__port_handler.setBaudRate(baud_rate):
+            self.disconnect()
+            raise DynamixelConnectionError("Failed to set baud rate.")
+        self.__baud_rate = baud_rate
+
+    def supports_baud_rate(self, baud_rate: int) -> bool:
+        return (self.__port_handler or PortHandler(self.__device)).getCFlagBaud(baud_rate) > 0
+
     def disconnect(self):
+        self.__should_be_connected = False
         if self.connected:
             self.__port_handler.closePort()
             self.__port_handler = None
@@ -188,53 +452,381 @@ class DynamixelConnector:
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.disconnect()
 
-    def read_field_async(self, field_name: str):
-        if not self.connected:
-            raise DynamixelError("Controller is not connected.")
-        field = self.__field_dict[field_name]
+    def __wait_for_tx(self):
         # Not waiting between two transmissions causes the controller to not reply
+        tracer = self.__packet_handler.tracer
+        start = time.perf_counter_ns() if tracer is not None else 0
         now = time.time()
         time.sleep(max(0.0, self.__tx_wait_time - (now - self.__last_tx)))
-        comm_result = self.__packet_handler.readTx(
-            self.__port_handler, self.__dynamixel_id, field.address, struct.calcsize(field.data_type))
+        if tracer is not None:
+            tracer(TX_WAIT, start, time.perf_counter_ns())
+
+    def __read_tx(self, template: TxTemplate):
+        if not self.connected:
+            raise DynamixelError("Controller is not connected.")
+        self.__wait_for_tx()
+        try:
+            comm_result = self.__packet_handler.read_tx(self.__port_handler, template)
+        except OSError as e:
+            raise DynamixelConnectionError("Lost connection to {}: {}".format(self.__device, e))
+        finally:
+            self.__port_handler.is_using = False
         self.__last_tx = time.time()
-        self.__port_handler.is_using = False
         if comm_result != 0:
             raise DynamixelCommunicationError(comm_result, self.__packet_handler, "reading")
-        future = FieldReadFuture(field, self, self.__packet_handler, self.__port_handler)
-        self.__future_queue.append(future)
-        self.process_futures(blocking=False)
+
+    def read_field_async(self, field_name: str, dynamixel_id: Optional[int] = None):
+        """
+        :param dynamixel_id: ID of the device to read from, if it is not the device of the connector (e.g. another
+                             gripper on the same bus).
+        """
+        field = self.__field_dict[field_name]
+        if dynamixel_id is None or dynamixel_id == self.__dynamixel_id:
+            template = self.__read_templates.get(field_name)
+            if template is None:
+                template = self.__read_templates[field_name] = self.__packet_handler.tx_template(
+                    INST_READ, self.__dynamixel_id, field.address, struct.calcsize(field.data_type))
+            dynamixel_id = None
+        else:
+            template = self.__packet_handler.tx_template(
+                INST_READ, dynamixel_id, field.address, struct.calcsize(field.data_type))
+        self.__read_tx(template)
+        future = FieldReadFuture(field, self, self.__packet_handler, self.__port_handler, dynamixel_id)
+        self.__enqueue(future, template.length)
+        return future
+
+    def read_fields_async(self, field_names: Sequence[str]) -> BlockReadFuture:
+        """
+        Reads multiple fields with a single read instruction that covers the address range from the first to the last
+        field. Unlike group_read, this works for arbitrary fields and both gripper models.
+        :param field_names: Names of the fields to read.
+        :return: Future resolving to a dictionary mapping the field names to their values.
+        """
+        fields = [self.__field_dict[n] for n in field_names]
+        address = min(f.address for f in fields)
+        length = max(f.address + struct.calcsize(f.data_type) for f in fields) - address
+        if length > MAX_BLOCK_READ_LENGTH:
+            raise DynamixelError("Fields span {} bytes, but a single read is limited to {} bytes.".format(
+                length, MAX_BLOCK_READ_LENGTH))
+        self.__read_tx(self.__packet_handler.tx_template(INST_READ, self.__dynamixel_id, address, length))
+        future = BlockReadFuture(fields, address, length, self, self.__packet_handler, self.__port_handler)
+        self.__enqueue(future, length)
         return future
 
     def write_field_async(self, field_name: str, value: int):
         if not self.connected:
             raise DynamixelError("Controller is not connected.")
-        field = self.__field_dict[field_name]
-        data = list(struct.pack("<{}".format(field.data_type), value))
-        # Not waiting between two transmissions causes the controller to not reply
-        now = time.time()
-        time.sleep(max(0.0, self.__tx_wait_time - (now - self.__last_tx)))
-        comm_result = self.__packet_handler.writeTxOnly(
-            self.__port_handler, self.__dynamixel_id, field.address, len(data), data)
+        template = self.__write_templates.get(field_name)
+        if template is None:
+            field = self.__field_dict[field_name]
+            template = self.__write_templates[field_name] = self.__packet_handler.tx_template(
+                INST_WRITE, self.__dynamixel_id, field.address, struct.calcsize(field.data_type), field.data_type)
+        self.__wait_for_tx()
+        try:
+            comm_result = self.__packet_handler.write_tx(self.__port_handler, template, value)
+        except OSError as e:
+            raise DynamixelConnectionError("Lost connection to {}: {}".format(self.__device, e))
+        finally:
+            self.__port_handler.is_using = False
         self.__last_tx = time.time()
-        self.__port_handler.is_using = False
         if comm_result != 0:
             raise DynamixelCommunicationError(comm_result, self.__packet_handler, "writing")
-        future = FieldWriteFuture(self, self.__packet_handler, self.__port_handler)
-        self.__future_queue.append(future)
-        self.process_futures(blocking=False)
+        expects_reply = self.__status_return_level >= 2
+        future = FieldWriteFuture(self, self.__packet_handler, self.__port_handler, expects_reply=expects_reply)
+        if expects_reply:
+            self.__enqueue(future, 0)
         return future
 
-    def read_field(self, field_name: str):
+    def write_fields_async(self, values: Dict[str, int]) -> FieldWriteFuture:
+        """
+        Writes multiple fields that occupy a contiguous address range with a single write instruction.
+        :param values: Values by field name.
+        """
+        return self.__write_block(values, INST_WRITE, None)
+
+    def reg_write_fields_async(self, values: Dict[str, int], dynamixel_id: Optional[int] = None) -> FieldWriteFuture:
+        """
+        Stages a write of multiple fields that occupy a contiguous address range with a REG_WRITE instruction. The
+        values are applied by the next ACTION instruction (see action and synchronized_write). A device holds a single
+        registered instruction, hence staging again replaces the previously staged write.
+        :param values: Values by field name.
+        :param dynamixel_id: ID of the device to stage the write on, if it is not the device of the connector.
+        """
+        return self.__write_block(values, INST_REG_WRITE, dynamixel_id)
+
+    def __write_block(self, values: Dict[str, int], instruction: int, dynamixel_id: Optional[int]) -> FieldWriteFuture:
+        if not self.connected:
+            raise DynamixelError("Controller is not connected.")
+        fields = sorted((self.__field_dict[n] for n in values), key=lambda f: f.address)
+        for previous, field in zip(fields[:-1], fields[1:]):
+            if previous.address + struct.calcsize(previous.data_type) != field.address:
+                raise DynamixelError("The fields {} and {} are not adjacent.".format(previous.name, field.name))
+        data = list(b"".join(struct.pack("<{}".format(f.data_type), values[f.name]) for f in fields))
+        dxl_id = self.__dynamixel_id if dynamixel_id is None else dynamixel_id
+        self.__wait_for_tx()
+        try:
+            if instruction == INST_WRITE:
+                comm_result = self.__packet_handler.writeTxOnly(
+                    self.__port_handler, dxl_id, fields[0].address, len(data), data)
+            else:
+                comm_result = self.__packet_handler.regWriteTxOnly(
+                    self.__port_handler, dxl_id, fields[0].address, len(data), data)
+        except OSError as e:
+            raise DynamixelConnectionError("Lost connection to {}: {}".format(self.__device, e))
+        finally:
+            self.__port_handler.is_using = False
+        self.__last_tx = time.time()
+        if comm_result != 0:
+            raise DynamixelCommunicationError(comm_result, self.__packet_handler, "writing")
+        expects_reply = self.__status_return_level >= 2 and dxl_id != BROADCAST_ID
+        future = FieldWriteFuture(self, self.__packet_handler, self.__port_handler, expects_reply=expects_reply,
+                                  dynamixel_id=dynamixel_id)
+        if expects_reply:
+            self.__enqueue(future, 0)
+        return future
+
+    def action_async(self, dynamixel_id: int = BROADCAST_ID) -> FieldWriteFuture:
+        """
+        Sends an ACTION instruction, which applies the writes staged with REG_WRITE. The broadcast ACTION triggers all
+        devices on the bus with a single packet and is not acknowledged.
+        :param dynamixel_id: ID of the device to trigger or BROADCAST_ID to trigger all devices.
+        """
+        if not self.connected:
+            raise DynamixelError("Controller is not connected.")
+        txpacket = [0] * 10
+        txpacket[PKT_ID] = dynamixel_id
+        txpacket[PKT_LENGTH_L] = 3
+        txpacket[PKT_LENGTH_H] = 0
+        txpacket[PKT_INSTRUCTION] = INST_ACTION
+        self.__wait_for_tx()
+        try:
+            comm_result = self.__packet_handler.txPacket(self.__port_handler, txpacket)
+        except OSError as e:
+            raise DynamixelConnectionError("Lost connection to {}: {}".format(self.__device, e))
+        finally:
+            self.__port_handler.is_using = False
+        self.__last_tx = time.time()
+        if comm_result != 0:
+            raise DynamixelCommunicationError(comm_result, self.__packet_handler, "sending action to")
+        expects_reply = self.__status_return_level >= 2 and dynamixel_id != BROADCAST_ID
+        future = FieldWriteFuture(self, self.__packet_handler, self.__port_handler, expects_reply=expects_reply,
+                                  dynamixel_id=dynamixel_id)
+        if expects_reply:
+            self.__enqueue(future, 0)
+        return future
+
+    def synchronized_write(self, values: Dict[int, Dict[str, int]], verify: bool = True,
+                           retry_policy: Optional[RetryPolicy] = None):
+        """
+        Writes to several devices on the bus such that the values take effect at the same time: the writes are staged
+        on each device with REG_WRITE and then applied by a single broadcast ACTION packet, hence the skew between the
+        devices does not grow with their number.
+        :param values: Values by field name for each Dynamixel ID. The fields of each device have to be adjacent.
+        :param verify: Whether to check the registered_instruction field of each device before triggering the writes.
+        :param retry_policy: Retry policy for staging the writes. The ACTION packet is sent once.
+        If staging fails, the devices that registered the write keep it until their next REG_WRITE or ACTION.
+        """
+        def stage():
+            futures = [self.reg_write_fields_async(v, dynamixel_id) for dynamixel_id, v in values.items()]
+            for future in futures:
+                future.result()
+            if verify:
+                futures = {i: self.read_field_async("registered_instruction", i) for i in values}
+                not_staged = [i for i, future in futures.items() if future.result() != 1]
+                if len(not_staged) > 0:
+                    raise DynamixelError("Devices {} did not register the write.".format(not_staged))
+
+        self.__with_retries(stage, retry_policy)
+        self.action_async()
+
+    def __enqueue(self, future: DynamixelFuture, parameter_length: int):
+        self.__future_queue.append((future, MIN_STATUS_PACKET_LENGTH + parameter_length))
+        self.__pending_reply_bytes += MIN_STATUS_PACKET_LENGTH + parameter_length
+        # Replies are read in large chunks once a result is needed. Only if they might overflow the receive buffer of the
+        # serial driver, they are processed right away.
+        if self.__pending_reply_bytes > MAX_PENDING_REPLY_BYTES:
+            self.process_futures(blocking=False)
+
+    def read_field(self, field_name: str, retry_policy: Optional[RetryPolicy] = None):
         # call to read one field via this function takes roughly 1ms if kernel's USB serial driver latency is set to 1ms (see README)
         # alternatively consider using group_read (can return multiple fields in one packet call)
-        value = self.read_field_async(field_name)
-        ret_val = value.result()
-        return ret_val
+        return self.__with_retries(lambda: self.read_field_async(field_name).result(), retry_policy)
+
+    def plan_block_reads(self, field_names: Sequence[str]) -> List[List[str]]:
+        """
+        Groups the given fields into as few blocks as possible, each of which can be read with a single read instruction.
+        Fields are only put into separate blocks if a block would exceed max_block_read_length bytes or if the gap
+        between two fields takes longer to transmit than the overhead of an additional read instruction.
+        :param field_names: Names of the fields to read.
+        :return: List of blocks, each containing the names of the fields read in that block.
+        """
+        # The overhead of an additional read is dominated by the latency of the USB serial driver (roughly 1ms), in which
+        # about baud_rate / 10000 bytes could have been transmitted
+        max_gap = max(16, self.__baud_rate // 10000)
+        max_length = self.max_block_read_length
+        blocks = []
+        block_start = block_end = None
+        for field in sorted((self.__field_dict[n] for n in field_names), key=lambda f: f.address):
+            field_end = field.address + struct.calcsize(field.data_type)
+            if block_start is None or field.address - block_end > max_gap or \
+                    field_end - block_start > max_length:
+                blocks.append([])
+                block_start = field.address
+                block_end = field_end
+            blocks[-1].append(field.name)
+            block_end = max(block_end, field_end)
+        return blocks
 
-    def write_field(self, field_name: str, value: int):
+    def read_fields(self, field_names: Sequence[str], retry_policy: Optional[RetryPolicy] = None) -> Dict[str, int]:
+        # reading a block of fields takes roughly as long as reading a single field, as long as the block is small
+        def read():
+            futures = [self.read_fields_async(b) for b in self.plan_block_reads(field_names)]
+            values = {}
+            for future in futures:
+                values.update(future.result())
+            return values
+
+        return self.__with_retries(read, retry_policy)
+
+    def snapshot(self) -> Dict[str, int]:
+        """
+        Reads the complete control table (EEPROM and RAM) in as few read instructions as possible.
+        :return: Dictionary mapping the names of all fields to their values.
+        """
+        return self.read_fields(list(self.__field_dict))
+
+    def write_changed_fields(self, values: Dict[str, int], current: Optional[Dict[str, int]] = None) -> Dict[str, int]:
+        """
+        Writes all given fields whose current value differs. If EEPROM fields have to be written, torque is disabled
+        temporarily. If torque_enable is among the given fields, it is written last.
+        :param values: Dictionary mapping field names to their desired values.
+        :param current: Current values of the fields (including torque_enable) if known already. If None, they are read
+                        with read_fields.
+        :return: Dictionary of the fields that have been changed.
+        """
+        if current is None:
+            current = self.read_fields(list(set(values) | {"torque_enable"}))
+        changed = {n: v for n, v in values.items() if current[n] != v}
+        torque_enable = changed.pop("torque_enable", None)
+        # The torque_enable field is the first field of the RAM area in both gripper models
+        ram_start = self.__field_dict["torque_enable"].address
+        eeprom_changed = any(self.__field_dict[n].address < ram_start for n in changed)
+        initial_torque_enabled = torque_enabled = current["torque_enable"] if "torque_enable" in current else \
+            self.read_field("torque_enable")
+        if eeprom_changed and torque_enabled:
+            self.write_field("torque_enable", 0)
+            torque_enabled = 0
+        for name in sorted(changed, key=lambda n: self.__field_dict[n].address):
+            self.write_field(name, changed[name])
+        if torque_enable is None:
+            torque_enable = initial_torque_enabled
+        if torque_enable != torque_enabled:
+            self.write_field("torque_enable", torque_enable)
+        if torque_enable != initial_torque_enabled:
+            changed["torque_enable"] = torque_enable
+        return changed
+
+    def restore(self, snapshot: Dict[str, int],
+                exclude: Sequence[str] = ("id", "baud_rate", "status_return_level", "bus_watchdog")) -> Dict[str, int]:
+        """
+        Writes back all writable fields of a snapshot whose current value differs. If EEPROM fields have to be written,
+        torque is disabled temporarily. Torque is set to the value of the snapshot last. Note that goal values are
+        restored as well, hence the gripper might move if torque is enabled.
+        :param snapshot: Snapshot as returned by snapshot.
+        :param exclude: Fields that are never written. By default, fields that would break the connection are excluded.
+        :return: Dictionary of the fields that have been written.
+        """
+        # Indirect data fields are only views on the fields their indirect addresses point to
+        values = {n: v for n, v in snapshot.items()
+                  if self.__field_dict[n].writable and n not in exclude and not n.startswith("indirect_data_")}
+        return self.write_changed_fields(values, self.read_fields(list(set(values) | {"torque_enable"})))
+
+    def write_field(self, field_name: str, value: int, retry_policy: Optional[RetryPolicy] = None):
         # call to via this function takes roughly 1ms if kernel's USB serial driver latency is set to 1ms (see README)
-        return self.write_field_async(field_name, value).result()
+        return self.__with_retries(lambda: self.write_field_async(field_name, value).result(), retry_policy)
+
+    def write_fields(self, values: Dict[str, int], retry_policy: Optional[RetryPolicy] = None):
+        """
+        Writes multiple fields that occupy a contiguous address range with a single write instruction.
+        """
+        return self.__with_retries(lambda: self.write_fields_async(values).result(), retry_policy)
+
+    def write_batch(self, writes: Sequence[Tuple[str, int]], retry_policy: Optional[RetryPolicy] = None):
+        """
+        Writes the given fields in order. Consecutive writes to adjacent addresses are merged into one write instruction
+        and the write instructions are pipelined, such that all of them take a single round trip.
+        :param writes: Pairs of field name and value in the order they are written.
+        """
+        runs: List[Dict[str, int]] = []
+        previous_end = None
+        for field_name, value in writes:
+            if field_name not in self.__field_dict:
+                raise DynamixelError("Unknown field {}.".format(field_name))
+            field = self.__field_dict[field_name]
+            if previous_end == field.address:
+                runs[-1][field_name] = value
+            else:
+                runs.append({field_name: value})
+            previous_end = field.address + struct.calcsize(field.data_type)
+
+        def write():
+            futures = [self.write_fields_async(run) for run in runs]
+            for future in futures:
+                future.result()
+        self.__with_retries(write, retry_policy)
+
+    def __with_retries(self, operation, retry_policy: Optional[RetryPolicy]):
+        if retry_policy is None:
+            retry_policy = self.__retry_policy
+        if retry_policy is None:
+            return operation()
+        start = time.monotonic()
+        deadline = start + retry_policy.deadline
+        backoff = retry_policy.initial_backoff
+        default_packet_timeout_ms = self.__packet_timeout_ms
+        attempt = 1
+        try:
+            while True:
+                # shorten the packet timeout such that the deadline is kept
+                self.__packet_timeout_ms = max(1.0, min(default_packet_timeout_ms,
+                                                        (deadline - time.monotonic()) * 1000))
+                try:
+                    if not self.connected and self.__should_be_connected and retry_policy.reopen_on_disconnect:
+                        self.__open_port()
+                    result = operation()
+                    if attempt > 1:
+                        self.__retry_metrics._record_recovery(time.monotonic() - start)
+                    return result
+                except (DynamixelCommunicationError, DynamixelConnectionError, OSError) as e:
+                    if attempt >= retry_policy.max_attempts or time.monotonic() + backoff >= deadline:
+                        self.__retry_metrics._record_failure()
+                        raise
+                    reopen = not isinstance(e, DynamixelCommunicationError) and retry_policy.reopen_on_disconnect
+                    self.__recover(reopen)
+                    self.__retry_metrics._record_retry(reopen)
+                    time.sleep(backoff)
+                    backoff = min(2 * backoff, retry_policy.max_backoff)
+                    attempt += 1
+        finally:
+            self.__packet_timeout_ms = default_packet_timeout_ms
+
+    def __recover(self, reopen: bool):
+        # The replies of pending transactions are lost or will be discarded with the input buffer
+        while len(self.__future_queue) > 0:
+            self.__future_queue.popleft()[0]._abort()
+        self.__pending_reply_bytes = 0
+        self.__packet_handler.clear_rx_buffer()
+        if self.connected:
+            try:
+                if reopen:
+                    self.__port_handler.closePort()
+                else:
+                    self.__port_handler.ser.reset_input_buffer()
+            except OSError:
+                reopen = True
+            if reopen:
+                # the port is reopened with the next attempt
+                self.__port_handler = None
 
     def group_read(self):
         '''
@@ -245,21 +837,24 @@ class DynamixelConnector:
 
         # on first call, check whether the gripper type is supported
         if not self.__checked_gripper_type:
-            self.__checked_gripper_type = True
             from rhp12rn import RHP12RNAConnector
             if not(isinstance(self, RHP12RNAConnector)):
                 raise DynamixelError("Only RHP12RNAConnector is supported for current implementation of group_read, because"
                                      "of hard coded packet position values.")
-            # if check is passed generate the objects
+            self.__checked_gripper_type = True
+
+        if self.__groupSyncRead is None:
             self.__groupSyncRead = GroupSyncRead(self.__port_handler, self.__packet_handler, 568, 16)
             dxl_addparam_result = self.__groupSyncRead.addParam(self.__dynamixel_id)
             if dxl_addparam_result != True:
                 raise DynamixelError("[ID:%03d] groupSyncRead addparam failed" % self.__dynamixel_id)
 
         # Syncread present position
+        send_time = time.monotonic()
         dxl_comm_result = self.__groupSyncRead.txRxPacket()
+        receive_time = time.monotonic()
         if dxl_comm_result != COMM_SUCCESS:
-            raise DynamixelError("%s" % packetHandler.getTxRxResult(dxl_comm_result))
+            raise DynamixelError("%s" % self.__packet_handler.getTxRxResult(dxl_comm_result))
 
         # Check if groupsyncread data of Dynamixel#1 is available
         dxl_getdata_result = self.__groupSyncRead.isAvailable(self.__dynamixel_id, 568, 16)
@@ -267,31 +862,83 @@ class DynamixelConnector:
             raise DynamixelError("[ID:%03d] groupSyncRead getdata failed" % self.__dynamixel_id)
 
         # Decode the message
-        real_time_tick = self.__groupSyncRead.getData(self.__dynamixel_id, 568, 2)
-        moving = self.__groupSyncRead.getData(self.__dynamixel_id, 570, 1)
-        moving_status = self.__groupSyncRead.getData(self.__dynamixel_id, 571, 1)
-        present_pwm = self.__groupSyncRead.getData(self.__dynamixel_id, 572, 2)
-        present_current = self.__groupSyncRead.getData(self.__dynamixel_id, 574, 2)
-        dxl_present_velocity = self.__groupSyncRead.getData(self.__dynamixel_id, 576, 4)
-        present_position = self.__groupSyncRead.getData(self.__dynamixel_id, 580, 4)
-        # convert current to signed int cf. https://github.com/ROBOTIS-GIT/DynamixelSDK/issues/264
-        if present_current > 0x7fff:
-            present_current = present_current - 65536
-
-        if dxl_present_velocity > 0x7fffffff:
-            dxl_present_velocity = dxl_present_velocity - 4294967296
-
-        # Return the values as a dictionary
-        return dict({'real_time_tick': real_time_tick, 'moving': moving, 'present_current': present_current,
-                     'moving_status': moving_status, 'present_pwm': present_pwm, 'present_velocity': dxl_present_velocity,
-                     'present_position': present_position})
+        status = group_read_result({
+            n: self.__groupSyncRead.getData(self.__dynamixel_id, self.__field_dict[n].address,
+                                            struct.calcsize(self.__field_dict[n].data_type)) for n in GROUP_READ_FIELDS})
+        if self.__device_clock is not None:
+            # host time (time.monotonic) at which the gripper acquired the sample
+            status['acquisition_time'] = self.__device_clock.update(status['real_time_tick'], send_time, receive_time)
+        return status
+
 
+    def enable_fire_and_forget_writes(self, bus_watchdog_ms: Optional[int] = 100):
+        """
+        Sets the status return level of the gripper to 1, such that write instructions are not acknowledged anymore.
+        Afterwards, write_field returns as soon as the instruction packet has been sent, which roughly doubles the write
+        throughput. Since a lost write cannot be detected in this mode, the bus watchdog is armed, which stops the
+        gripper if it does not receive any instruction packet for bus_watchdog_ms milliseconds (e.g. because the host
+        stalled). Note that once the watchdog has tripped, the gripper ignores goal values until reset_bus_watchdog is
+        called.
+        :param bus_watchdog_ms: Bus watchdog timeout in ms (resolution 20ms, at most 2540ms) or None to leave the bus
+                                watchdog disabled.
+        """
+        if bus_watchdog_ms is not None:
+            if "bus_watchdog" not in self.__field_dict:
+                raise DynamixelError("This gripper model does not provide a bus watchdog.")
+            self.__bus_watchdog_value = min(max(int(round(bus_watchdog_ms / 20)), 1), 127)
+            self.reset_bus_watchdog()
+        self.__set_status_return_level(1)
+
+    def disable_fire_and_forget_writes(self):
+        """
+        Restores the default status return level of 2 (every instruction is acknowledged) and disarms the bus watchdog.
+        """
+        self.__set_status_return_level(2)
+        if self.__bus_watchdog_value != 0:
+            self.__bus_watchdog_value = 0
+            self.write_field("bus_watchdog", 0)
+
+    def reset_bus_watchdog(self):
+        """
+        Clears a tripped bus watchdog and re-arms it with the timeout set in enable_fire_and_forget_writes.
+        """
+        # Writing 0 clears the bus watchdog error, afterwards the watchdog can be armed again
+        self.write_field("bus_watchdog", 0)
+        if self.__bus_watchdog_value != 0:
+            self.write_field("bus_watchdog", self.__bus_watchdog_value)
+
+    def __set_status_return_level(self, level: int):
+        self.process_futures()
+        # Whether the gripper acknowledges this very write depends on the old and the new level, hence we do not wait
+        # for a reply
+        self.__write_without_reply("status_return_level", level)
+        self.__status_return_level = level
+        # Read instructions are always answered, hence the new level can be verified
+        if self.read_field("status_return_level") != level:
+            raise DynamixelError("Failed to set status return level to {}.".format(level))
+
+    def __write_without_reply(self, field_name: str, value: int):
+        # Sends a write instruction and discards whatever the gripper replies
+        status_return_level = self.__status_return_level
+        self.__status_return_level = 1
+        try:
+            self.write_field_async(field_name, value)
+        finally:
+            self.__status_return_level = status_return_level
+        time.sleep(0.01)
+        self.__port_handler.ser.reset_input_buffer()
+        self.__packet_handler.clear_rx_buffer()
 
     def process_futures(self, stop_on: Optional[DynamixelFuture] = None, blocking: bool = True):
         while len(self.__future_queue) > 0:
-            future = self.__future_queue[0]
-            if future._read(blocking):
+            future, reply_length = self.__future_queue[0]
+            try:
+                read = future._read(blocking)
+            except OSError as e:
+                raise DynamixelConnectionError("Lost connection to {}: {}".format(self.__device, e))
+            if read:
                 self.__future_queue.popleft()
+                self.__pending_reply_bytes -= reply_length
             else:
                 break
             if future == stop_on:
@@ -301,6 +948,74 @@ class DynamixelConnector:
     def connected(self):
         return self.__port_handler is not None
 
+    @property
+    def device_clock(self) -> Optional[DeviceClock]:
+        """
+        If set, group_read stamps each status with the estimated host time at which the gripper acquired it
+        (key 'acquisition_time').
+        """
+        return self.__device_clock
+
+    @device_clock.setter
+    def device_clock(self, value: Optional[DeviceClock]):
+        self.__device_clock = value
+
+    @property
+    def tracer(self) -> Optional[TraceHook]:
+        """
+        Hook that is called with the name, start and end time (time.perf_counter_ns) of each stage of a transaction,
+        see rhp12rn.tracing. Tracing is disabled if None.
+        """
+        return self.__packet_handler.tracer
+
+    @tracer.setter
+    def tracer(self, value: Optional[TraceHook]):
+        self.__packet_handler.tracer = value
+
+    @property
+    def retry_policy(self) -> Optional[RetryPolicy]:
+        return self.__retry_policy
+
+    @retry_policy.setter
+    def retry_policy(self, value: Optional[RetryPolicy]):
+        self.__retry_policy = value
+
+    @property
+    def retry_metrics(self) -> RetryMetrics:
+        return self.__retry_metrics
+
+    @property
+    def packet_timeout_ms(self) -> float:
+        return self.__packet_timeout_ms
+
+    @packet_timeout_ms.setter
+    def packet_timeout_ms(self, value: float):
+        self.__packet_timeout_ms = value
+
+    @property
+    def max_block_read_length(self) -> int:
+        """
+        Largest number of bytes that plan_block_reads puts into a single read, such that the status packet is
+        transmitted within BLOCK_READ_TIMEOUT_FRACTION of the packet timeout at the baud rate of the connector (e.g.
+        277 bytes at 57600 baud and a packet timeout of 100ms). Never exceeds MAX_BLOCK_READ_LENGTH.
+        """
+        # 8 data bits, a start and a stop bit per byte
+        transferable = int(self.__packet_timeout_ms / 1000 * BLOCK_READ_TIMEOUT_FRACTION * self.__baud_rate / 10)
+        # a block always fits at least the largest field (4 bytes)
+        return max(4, min(MAX_BLOCK_READ_LENGTH, transferable - MIN_STATUS_PACKET_LENGTH))
+
+    @property
+    def baud_rate(self) -> int:
+        return self.__baud_rate
+
+    @property
+    def device(self) -> str:
+        return self.__device
+
+    @property
+    def packet_handler(self) -> CustomProtocol2PacketHandler:
+        return self.__packet_handler
+
     @property
     def fields(self) -> Dict[str, Field]:
         return self.__field_dict
@@ -308,3 +1023,7 @@ class DynamixelConnector:
     @property
     def dynamixel_id(self) -> int:
         return self.__dynamixel_id
+
+    @property
+    def fire_and_forget_writes(self) -> bool:
+        return self.__status_return_level < 2
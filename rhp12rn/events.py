@@ -0,0 +1,183 @@
+"""
+MIT License
+
+Copyright (c) 2021 Tim Schneider
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .dynamixel_connector import DynamixelError
+from .poller import AdaptivePoller
+
+
+class Subscription:
+    """
+    Fires when its condition becomes true in a status read by the poller. Application code can either pass a callback
+    (called from the polling thread) or wait for the subscription.
+    """
+
+    def __init__(self, condition: Callable[[Dict[str, int], float], bool],
+                 callback: Optional[Callable[[Dict[str, int]], None]], once: bool):
+        self.__condition = condition
+        self.__callback = callback
+        self.__once = once
+        self.__event = threading.Event()
+        self.__previous = False
+        self.__status: Optional[Dict[str, int]] = None
+        self.__cancelled = False
+
+    def _evaluate(self, status: Dict[str, int], status_time: float) -> bool:
+        """
+        :return: Whether the subscription is done and can be removed.
+        """
+        if self.__cancelled:
+            return True
+        current = self.__condition(status, status_time)
+        # only rising edges fire, such that repeated subscriptions do not fire in every cycle
+        if current and not self.__previous:
+            self.__status = status
+            self.__event.set()
+            if self.__callback is not None:
+                self.__callback(status)
+        self.__previous = current
+        return self.__once and self.__event.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Blocks until the subscription fired.
+        :return: False if the timeout passed before.
+        """
+        return self.__event.wait(timeout)
+
+    def cancel(self):
+        self.__cancelled = True
+
+    @property
+    def fired(self) -> bool:
+        return self.__event.is_set()
+
+    @property
+    def status(self) -> Optional[Dict[str, int]]:
+        """
+        Status that made the subscription fire the last time.
+        """
+        return self.__status
+
+
+class GripperEvents:
+    """
+    Evaluates event subscriptions on the statuses read by an AdaptivePoller, such that any number of watchers share a
+    single read per cycle instead of polling the gripper in their own loops.
+    Note that while the gripper is idle, the poller only reads the full status every idle_refresh seconds, hence events
+    that occur without motion (e.g. a hardware error at standstill) are detected with this delay.
+    """
+
+    def __init__(self, poller: AdaptivePoller, position_limits: Optional[Tuple[int, int]] = None):
+        """
+        :param poller: Poller whose statuses are evaluated.
+        :param position_limits: Lower and upper position limit used to compute relative positions. Read from the gripper
+                                if None, hence, the poller must not be running yet in this case.
+        """
+        if position_limits is None:
+            limits = poller.connector.read_fields(["min_position_limit", "max_position_limit"])
+            position_limits = limits["min_position_limit"], limits["max_position_limit"]
+        self.__poller = poller
+        self.__position_limits = position_limits
+        self.__subscriptions: List[Subscription] = []
+        self.__lock = threading.Lock()
+        poller.add_listener(self.__on_status)
+
+    def close(self):
+        self.__poller.remove_listener(self.__on_status)
+
+    def __on_status(self, status: Dict[str, int]):
+        status_time = self.__poller.status_time
+        with self.__lock:
+            subscriptions = list(self.__subscriptions)
+        done = [s for s in subscriptions if s._evaluate(status, status_time)]
+        if len(done) > 0:
+            with self.__lock:
+                self.__subscriptions = [s for s in self.__subscriptions if s not in done]
+
+    def __require(self, *field_names: str):
+        missing = [f for f in field_names if f not in self.__poller.status_fields]
+        if len(missing) > 0:
+            raise DynamixelError("The poller does not read the fields {}.".format(", ".join(missing)))
+
+    def subscribe(self, condition: Callable[[Dict[str, int], float], bool],
+                  callback: Optional[Callable[[Dict[str, int]], None]] = None, once: bool = True) -> Subscription:
+        """
+        :param condition: Function of the status and the time (time.monotonic) it was read.
+        :param callback: Called with the status when the condition becomes true.
+        :param once: Whether the subscription is removed after it fired for the first time.
+        """
+        subscription = Subscription(condition, callback, once)
+        with self.__lock:
+            self.__subscriptions.append(subscription)
+        return subscription
+
+    def to_rel(self, position: int) -> float:
+        low, high = self.__position_limits
+        return (position - low) / (high - low)
+
+    def on_grip(self, callback: Optional[Callable[[Dict[str, int]], None]] = None,
+                once: bool = True) -> Subscription:
+        """
+        Fires when the gripper detects that it grasped an object (RH-P12-RN(A) only).
+        """
+        self.__require("grip_detection")
+        return self.subscribe(lambda status, t: status["grip_detection"] != 0, callback, once)
+
+    def on_position_reached(self, position_rel: float, tolerance: float = 0.01,
+                            callback: Optional[Callable[[Dict[str, int]], None]] = None,
+                            once: bool = True) -> Subscription:
+        """
+        Fires when the relative position is within tolerance of position_rel.
+        """
+        self.__require("present_position")
+        return self.subscribe(
+            lambda status, t: abs(self.to_rel(status["present_position"]) - position_rel) <= tolerance, callback, once)
+
+    def on_hardware_error(self, callback: Optional[Callable[[Dict[str, int]], None]] = None,
+                          once: bool = True) -> Subscription:
+        """
+        Fires when the gripper reports a hardware error (see hardware_error_status for the cause).
+        """
+        self.__require("hardware_error_status")
+        return self.subscribe(lambda status, t: status["hardware_error_status"] != 0, callback, once)
+
+    def on_stall(self, duration: float = 0.2, tolerance: int = 1,
+                 callback: Optional[Callable[[Dict[str, int]], None]] = None, once: bool = True) -> Subscription:
+        """
+        Fires when the position did not change by more than tolerance (absolute units) for duration seconds, e.g.
+        because the fingers are blocked by an object.
+        """
+        self.__require("present_position")
+        reference = [None, 0.0]
+
+        def stalled(status: Dict[str, int], status_time: float) -> bool:
+            position = status["present_position"]
+            if reference[0] is None or abs(position - reference[0]) > tolerance:
+                reference[0], reference[1] = position, status_time
+            return status_time - reference[1] >= duration
+
+        return self.subscribe(stalled, callback, once)
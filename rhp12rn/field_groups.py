@@ -0,0 +1,215 @@
+"""
+MIT License
+
+Copyright (c) 2021 Tim Schneider
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import struct
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .dynamixel_connector import DynamixelConnector, DynamixelError, Field
+from .custom_protocol2_packet_handler import MIN_STATUS_PACKET_LENGTH
+
+
+class _FieldGroup:
+    def __init__(self, name: str, fields: Sequence[Field], rate: float):
+        self.name = name
+        self.fields = list(fields)
+        self.period = 1.0 / rate
+        self.next_due = -float("inf")
+        self.reads = 0
+        self.last_read = None
+
+
+class MultiRateReader:
+    """
+    Reads groups of fields at individual rates, e.g. position and current at 1kHz but temperature and input voltage at
+    1Hz, with a single read instruction per cycle. In each cycle, only the groups that are due are read. By default, a
+    due group is added to the block read of the cycle, which covers the address range of all due fields. If the fields
+    of the groups are far apart in the control table, use_indirect_data maps them into the indirect data area ordered
+    by rate, such that a cycle reads the shortest prefix of the area that contains all due groups.
+    """
+
+    def __init__(self, connector: DynamixelConnector):
+        """
+        :param connector: Connected connector of the gripper.
+        """
+        self.__connector = connector
+        self.__groups: List[_FieldGroup] = []
+        self.__values: Dict[str, int] = {}
+        # start of the mapping in the indirect data area and offset of each field in it, None if not used
+        self.__indirect_start: Optional[int] = None
+        self.__indirect_offsets: Dict[str, int] = {}
+        self.__group_ends: Dict[str, int] = {}
+        self.reset_counters()
+
+    def reset_counters(self):
+        self.__cycles = 0
+        self.__bytes_read = 0
+        self.__start_time = time.monotonic()
+        for group in self.__groups:
+            group.reads = 0
+
+    def add_group(self, name: str, fields: Sequence[str], rate: float):
+        """
+        Declares a group of fields that is read at the given rate. Groups faster than the rate at which read is called
+        are read in every cycle.
+        :param name: Name of the group.
+        :param fields: Names of the fields of the group.
+        :param rate: Target rate in Hz.
+        """
+        if any(g.name == name for g in self.__groups):
+            raise DynamixelError("Group {} exists already.".format(name))
+        self.__groups.append(_FieldGroup(name, [self.__connector.fields[f] for f in fields], rate))
+        # groups are kept in the order of their rate, which is the order of their fields in the indirect data area
+        self.__groups.sort(key=lambda g: g.period)
+        self.__indirect_start = None
+
+    def use_indirect_data(self, first_index: int = 1):
+        """
+        Maps the fields of all groups into the indirect data area, fastest group first. Indirect addresses are in the
+        EEPROM, hence they are only written if they differ from the mapping and torque has to be disabled in this
+        case. Groups added afterwards require calling this method again.
+        :param first_index: Index of the first indirect address to use.
+        """
+        addresses = []
+        offsets = {}
+        group_ends = {}
+        for group in self.__groups:
+            for field in group.fields:
+                if field.name not in offsets:
+                    offsets[field.name] = len(addresses)
+                    addresses += range(field.address, field.address + struct.calcsize(field.data_type))
+            group_ends[group.name] = len(addresses)
+        address_fields = ["indirect_address_{}".format(first_index + i) for i in range(len(addresses))]
+        if any(f not in self.__connector.fields for f in address_fields):
+            raise DynamixelError("The groups require {} indirect addresses starting at index {}, which exceeds the "
+                                 "indirect data area.".format(len(addresses), first_index))
+        current = self.__connector.read_fields(address_fields + ["torque_enable"])
+        values = dict(zip(address_fields, addresses))
+        if any(current[f] != v for f, v in values.items()):
+            if current["torque_enable"]:
+                raise DynamixelError("Torque has to be disabled to change the indirect addresses.")
+            self.__connector.write_fields(values)
+        self.__indirect_start = first_index
+        self.__indirect_offsets = offsets
+        self.__group_ends = group_ends
+
+    def __due_groups(self, now: float) -> List[_FieldGroup]:
+        # groups are due half a period of the fastest group early, such that the jitter of a loop running at the rate
+        # of the fastest group does not cause it to skip cycles
+        slack = self.__groups[0].period / 2 if len(self.__groups) > 0 else 0.0
+        return [g for g in self.__groups if now >= g.next_due - slack]
+
+    def __read_blocks(self, due: List[_FieldGroup]) -> Tuple[Dict[str, int], List[_FieldGroup]]:
+        due_fields = {f.name for g in due for f in g.fields}
+        blocks = self.__connector.plan_block_reads(sorted(due_fields))
+        ranges = []
+        for block in blocks:
+            fields = [self.__connector.fields[f] for f in block]
+            ranges.append((min(f.address for f in fields),
+                           max(f.address + struct.calcsize(f.data_type) for f in fields)))
+        # groups that are not due but lie within the blocks anyway are read without additional bytes
+        covered = [g for g in self.__groups if all(
+            any(start <= f.address and f.address + struct.calcsize(f.data_type) <= end for start, end in ranges)
+            for f in g.fields)]
+        covered_fields = {f.name for g in covered for f in g.fields}
+        futures = []
+        for block, (start, end) in zip(blocks, ranges):
+            fields = set(block) | {f for f in covered_fields
+                                   if start <= self.__connector.fields[f].address < end}
+            futures.append(self.__connector.read_fields_async(sorted(fields)))
+            self.__bytes_read += end - start + MIN_STATUS_PACKET_LENGTH
+        values = {}
+        for future in futures:
+            values.update(future.result())
+        return values, covered
+
+    def __read_indirect(self, due: List[_FieldGroup]) -> Tuple[Dict[str, int], List[_FieldGroup]]:
+        length = max(self.__group_ends[g.name] for g in due)
+        names = ["indirect_data_{}".format(self.__indirect_start + i) for i in range(length)]
+        raw = self.__connector.read_fields_async(names).result()
+        data = bytes(raw[n] for n in names)
+        self.__bytes_read += length + MIN_STATUS_PACKET_LENGTH
+        # all groups in the prefix are read, including those that are not due
+        covered = [g for g in self.__groups if self.__group_ends[g.name] <= length]
+        values = {}
+        for group in covered:
+            for field in group.fields:
+                values[field.name] = struct.unpack_from(
+                    "<{}".format(field.data_type), data, self.__indirect_offsets[field.name])[0]
+        return values, covered
+
+    def read(self) -> Dict[str, int]:
+        """
+        Reads the groups that are due with a single read instruction (or a few pipelined ones if the fields span more
+        than plan_block_reads merges into a block). Call this in the loop of the fastest group.
+        :return: Values of the fields read in this cycle.
+        """
+        now = time.monotonic()
+        due = self.__due_groups(now)
+        if len(due) == 0:
+            return {}
+        if self.__indirect_start is not None:
+            values, read_groups = self.__read_indirect(due)
+        else:
+            values, read_groups = self.__read_blocks(due)
+        for group in read_groups:
+            if group.next_due + group.period < now:
+                # the group fell behind (or has not been read yet), the following cycles do not catch up
+                group.next_due = now + group.period
+            else:
+                group.next_due += group.period
+            group.reads += 1
+            group.last_read = now
+        self.__values.update(values)
+        self.__cycles += 1
+        return values
+
+    def group_rate(self, name: str) -> float:
+        """
+        :return: Rate in Hz at which the group has been read since the counters were reset.
+        """
+        group = next(g for g in self.__groups if g.name == name)
+        return group.reads / max(1e-9, time.monotonic() - self.__start_time)
+
+    @property
+    def values(self) -> Dict[str, int]:
+        """
+        Latest value of every field read so far.
+        """
+        return dict(self.__values)
+
+    @property
+    def group_names(self) -> List[str]:
+        return [g.name for g in self.__groups]
+
+    @property
+    def cycles(self) -> int:
+        return self.__cycles
+
+    @property
+    def bytes_read(self) -> int:
+        """
+        Number of bytes of the status packets of all reads since the counters were reset.
+        """
+        return self.__bytes_read
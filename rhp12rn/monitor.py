@@ -0,0 +1,225 @@
+"""
+MIT License
+
+Copyright (c) 2021 Tim Schneider
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import argparse
+import sys
+import time
+from collections import deque
+from typing import Optional, Sequence, Dict, List, TextIO
+
+from .dynamixel_connector import DynamixelConnector, DynamixelError, DynamixelFuture
+
+MONITOR_FIELDS = ("realtime_tick", "present_position", "present_velocity", "present_current", "present_input_voltage",
+                  "present_temperature")
+# fields of data type "H" that hold signed values
+_SIGNED_16_BIT_FIELDS = ("present_current", "present_pwm")
+_LATENCY_PERCENTILES = (50, 90, 99, 100)
+
+
+class TelemetryMonitor:
+    def __init__(self, connector: DynamixelConnector, fields: Optional[Sequence[str]] = None, rate: float = 1000.0,
+                 pipeline_depth: int = 1, window: int = 2000):
+        """
+        Samples the status of a gripper with block reads and keeps statistics of the achieved rate and latency.
+        :param connector: Connected connector of the gripper.
+        :param fields: Fields to sample. Defaults to all fields of MONITOR_FIELDS provided by the connector.
+        :param rate: Target sample rate in Hz. If 0, the gripper is sampled as fast as possible.
+        :param pipeline_depth: Number of reads in flight. Sending the next read before the reply of the previous one
+                               has been received hides the turnaround time of the bus, but the read may then collide
+                               with the reply on the half duplex bus, after which the controller stops replying.
+                               Only use a depth above 1 if the adapter and gripper are known to handle it.
+        :param window: Number of samples the latency percentiles and the sample rate are computed over.
+        """
+        if fields is None:
+            fields = [f for f in MONITOR_FIELDS if f in connector.fields]
+        self.__connector = connector
+        self.__blocks = connector.plan_block_reads(fields)
+        self.__period = 1.0 / rate if rate > 0 else 0.0
+        self.__pipeline_depth = max(1, pipeline_depth)
+        self.__in_flight = deque()
+        self.__next_send = time.perf_counter()
+        self.__latencies = deque(maxlen=window)
+        self.__sample_times = deque(maxlen=window)
+        self.__values: Dict[str, int] = {}
+        self.__samples = 0
+        self.__errors = 0
+
+    def step(self):
+        """
+        Sends the next read if it is due and a slot of the pipeline is free, otherwise waits for the oldest reply.
+        """
+        now = time.perf_counter()
+        if len(self.__in_flight) < self.__pipeline_depth and now >= self.__next_send:
+            futures = []
+            try:
+                for block in self.__blocks:
+                    futures.append(self.__connector.read_fields_async(block))
+            except DynamixelError:
+                # transmit errors (e.g. a disconnected adapter) are counted like failed replies
+                self.__errors += 1
+                self.__discard(futures)
+            else:
+                self.__in_flight.append((now, futures))
+            # a late send does not cause a burst of reads to catch up
+            self.__next_send = max(self.__next_send + self.__period, now)
+            return
+        if len(self.__in_flight) == 0:
+            time.sleep(max(0.0, self.__next_send - now))
+            return
+        send_time, futures = self.__in_flight.popleft()
+        try:
+            for future in futures:
+                self.__values.update(future.result())
+        except DynamixelError:
+            self.__errors += 1
+            self.__discard(futures)
+            return
+        receive_time = time.perf_counter()
+        self.__latencies.append(receive_time - send_time)
+        self.__sample_times.append(receive_time)
+        self.__samples += 1
+
+    def __discard(self, futures: List[DynamixelFuture]):
+        # the replies of the following reads might be out of order, hence they are discarded
+        pending = futures + [f for _, in_flight in self.__in_flight for f in in_flight]
+        self.__in_flight.clear()
+        for future in pending:
+            try:
+                future.result()
+            except DynamixelError:
+                pass
+
+    def finish(self):
+        """
+        Waits for the replies of all reads in flight.
+        """
+        while len(self.__in_flight) > 0:
+            self.__next_send = float("inf")
+            self.step()
+
+    def latency_percentiles(self) -> Dict[int, float]:
+        """
+        :return: Dictionary mapping the percentiles in _LATENCY_PERCENTILES to the latency in s over the window.
+        """
+        latencies = sorted(self.__latencies)
+        if len(latencies) == 0:
+            return {}
+        return {p: latencies[min(len(latencies) - 1, len(latencies) * p // 100)] for p in _LATENCY_PERCENTILES}
+
+    @property
+    def sample_rate(self) -> float:
+        """
+        Achieved sample rate in Hz over the window.
+        """
+        if len(self.__sample_times) < 2:
+            return 0.0
+        return (len(self.__sample_times) - 1) / (self.__sample_times[-1] - self.__sample_times[0])
+
+    @property
+    def values(self) -> Dict[str, int]:
+        values = dict(self.__values)
+        for name in _SIGNED_16_BIT_FIELDS:
+            if name in values and self.__connector.fields[name].data_type == "H" and values[name] > 0x7fff:
+                values[name] -= 0x10000
+        return values
+
+    @property
+    def samples(self) -> int:
+        return self.__samples
+
+    @property
+    def errors(self) -> int:
+        return self.__errors
+
+
+def render(monitor: TelemetryMonitor) -> List[str]:
+    values = monitor.values
+    lines = ["{:<24}{:>12}".format(name, values.get(name, "-")) for name in sorted(values)]
+    lines.append("")
+    lines.append("{:<24}{:>12.1f} Hz".format("sample rate", monitor.sample_rate))
+    for p, latency in monitor.latency_percentiles().items():
+        lines.append("{:<24}{:>12.3f} ms".format("latency p{}".format(p), latency * 1000))
+    lines.append("{:<24}{:>12}".format("samples", monitor.samples))
+    lines.append("{:<24}{:>12}".format("errors", monitor.errors))
+    return lines
+
+
+def run(monitor: TelemetryMonitor, display_rate: float = 10.0, duration: Optional[float] = None,
+        output: TextIO = sys.stdout):
+    """
+    Samples until the duration has passed or until interrupted and redraws the display at display_rate, which is kept
+    well below the sample rate such that drawing does not limit sampling.
+    """
+    start = time.perf_counter()
+    next_display = start
+    display_period = 1.0 / display_rate
+    try:
+        while duration is None or time.perf_counter() - start < duration:
+            monitor.step()
+            now = time.perf_counter()
+            if now >= next_display:
+                next_display = now + display_period
+                # move the cursor home and clear the screen before drawing
+                output.write("\x1b[H\x1b[2J" + "\n".join(render(monitor)) + "\n")
+                output.flush()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        monitor.finish()
+
+
+def main():
+    from .rhp12rn_connector import RHP12RNConnector
+    from .rhp12rna_connector import RHP12RNAConnector
+    from .util import discover_gripper
+
+    parser = argparse.ArgumentParser(description="Displays the status of a RH-P12-RN[(A)] gripper live.")
+    parser.add_argument("--model", choices=["rhp12rn", "rhp12rna"], default="rhp12rna")
+    parser.add_argument("--device", default="/dev/ttyUSB0")
+    parser.add_argument("--baud-rate", type=int, default=57600)
+    parser.add_argument("--id", type=int, default=1)
+    parser.add_argument("--discover", action="store_true",
+                        help="Ignore model, baud rate and ID and use the cached or discovered gripper of the device.")
+    parser.add_argument("--rate", type=float, default=1000.0, help="Sample rate in Hz (0 for as fast as possible).")
+    parser.add_argument("--display-rate", type=float, default=10.0, help="Refresh rate of the display in Hz.")
+    parser.add_argument("--pipeline-depth", type=int, default=1,
+                        help="Number of reads in flight. Depths above 1 may make the gripper stop replying.")
+    parser.add_argument("--duration", type=float, default=None, help="Time in s after which to stop.")
+    args = parser.parse_args()
+
+    if args.discover:
+        connector = discover_gripper(args.device)
+    else:
+        connector_type = RHP12RNConnector if args.model == "rhp12rn" else RHP12RNAConnector
+        connector = connector_type(device=args.device, baud_rate=args.baud_rate, dynamixel_id=args.id)
+        connector.connect()
+    try:
+        run(TelemetryMonitor(connector, rate=args.rate, pipeline_depth=args.pipeline_depth),
+            display_rate=args.display_rate, duration=args.duration)
+    finally:
+        connector.disconnect()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""
+MIT License
+
+Copyright (c) 2021 Tim Schneider
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Sequence
+
+from .dynamixel_connector import DynamixelConnector, DynamixelError
+
+DEFAULT_STATUS_FIELDS = ("hardware_error_status", "realtime_tick", "moving", "moving_status", "present_pwm",
+                         "present_current", "present_velocity", "present_position", "grip_detection")
+DEFAULT_PROBE_FIELDS = ("moving", "moving_status")
+
+# Bit of moving_status that is set while a profile is executed
+PROFILE_ONGOING = 0x02
+
+
+class AdaptivePoller:
+    """
+    Polls the status of a gripper at a high rate while it moves and falls back to reading only the moving and
+    moving_status registers at a low rate while it is idle (e.g. while holding a grasp). Writes submitted through the
+    poller switch it to the high rate right away, as they usually start a motion.
+    """
+
+    def __init__(self, connector: DynamixelConnector, active_rate: float = 500.0, idle_rate: float = 10.0,
+                 idle_delay: float = 0.25, idle_refresh: Optional[float] = 1.0,
+                 status_fields: Optional[Sequence[str]] = None, probe_fields: Optional[Sequence[str]] = None,
+                 callback: Optional[Callable[[Dict[str, int]], None]] = None):
+        """
+        :param connector: Connected connector of the gripper.
+        :param active_rate: Rate in Hz at which the full status is read while the gripper moves.
+        :param idle_rate: Rate in Hz at which the probe fields are read while the gripper is idle.
+        :param idle_delay: Hysteresis: time in seconds without motion before switching to the idle rate.
+        :param idle_refresh: Interval in seconds in which the full status is refreshed while idle or None to only read
+                             the probe fields.
+        :param status_fields: Fields read at the active rate. Defaults to all fields of DEFAULT_STATUS_FIELDS provided
+                              by the gripper model.
+        :param probe_fields: Fields read at the idle rate. Defaults to all fields of DEFAULT_PROBE_FIELDS provided by the
+                             gripper model.
+        :param callback: Called with the status after each full status read (see also add_listener).
+        """
+        if status_fields is None:
+            status_fields = [f for f in DEFAULT_STATUS_FIELDS if f in connector.fields]
+        if probe_fields is None:
+            probe_fields = [f for f in DEFAULT_PROBE_FIELDS if f in connector.fields]
+        self.__connector = connector
+        self.__active_period = 1.0 / active_rate
+        self.__idle_period = 1.0 / idle_rate
+        self.__idle_delay = idle_delay
+        self.__idle_refresh = idle_refresh
+        self.__status_fields = list(status_fields)
+        self.__probe_fields = list(probe_fields)
+        self.__listeners = () if callback is None else (callback,)
+        self.__commands = deque()
+        self.__wakeup = threading.Event()
+        self.__status: Dict[str, int] = {}
+        self.__status_time = 0.0
+        self.__last_motion = -float("inf")
+        self.__thread: Optional[threading.Thread] = None
+        self.__running = False
+        self.__last_error: Optional[DynamixelError] = None
+        self.reset_counters()
+
+    def reset_counters(self):
+        self.__status_reads = 0
+        self.__probe_reads = 0
+        self.__writes = 0
+        self.__errors = 0
+
+    @staticmethod
+    def is_moving(values: Dict[str, int]) -> bool:
+        return values.get("moving", 0) != 0 or values.get("moving_status", 0) & PROFILE_ONGOING != 0
+
+    def add_listener(self, listener: Callable[[Dict[str, int]], None]):
+        """
+        Registers a function that is called with the status after each full status read. Listeners are called from the
+        polling thread and should return quickly.
+        """
+        self.__listeners = self.__listeners + (listener,)
+
+    def remove_listener(self, listener: Callable[[Dict[str, int]], None]):
+        self.__listeners = tuple(l for l in self.__listeners if l is not listener)
+
+    def write_field(self, field_name: str, value: int):
+        """
+        Queues a write that is executed by the next step. Can be called from any thread.
+        """
+        self.__commands.append((field_name, value))
+        self.__wakeup.set()
+
+    def notify_command(self):
+        """
+        Switches to the active rate, e.g. after commanding the gripper directly through the connector.
+        """
+        self.__last_motion = time.monotonic()
+
+    def __execute_commands(self):
+        while len(self.__commands) > 0:
+            field_name, value = self.__commands.popleft()
+            try:
+                self.__connector.write_field(field_name, value)
+                self.__writes += 1
+            except DynamixelError as e:
+                print("Failed to write {}={}: {}".format(field_name, value, e))
+            self.__last_motion = time.monotonic()
+
+    def __read_status(self, now: float):
+        status = self.__connector.read_fields(self.__status_fields)
+        self.__status_reads += 1
+        self.__status = status
+        self.__status_time = now
+        if self.is_moving(status):
+            self.__last_motion = now
+        for listener in self.__listeners:
+            listener(status)
+
+    def step(self) -> float:
+        """
+        Executes pending writes and reads either the full status or the probe fields.
+        :return: Time in seconds until the next step is due.
+        """
+        self.__execute_commands()
+        now = time.monotonic()
+        if self.active:
+            self.__read_status(now)
+            return self.__active_period
+        if self.__idle_refresh is not None and now - self.__status_time >= self.__idle_refresh:
+            self.__read_status(now)
+        else:
+            probe = self.__connector.read_fields(self.__probe_fields)
+            self.__probe_reads += 1
+            if self.is_moving(probe):
+                # the motion was not commanded through the poller, read the full status right away
+                self.__last_motion = now
+                self.__read_status(now)
+                return self.__active_period
+        return self.__active_period if self.active else self.__idle_period
+
+    def run(self):
+        """
+        Polls until stop is called.
+        """
+        self.__running = True
+        next_step = time.monotonic()
+        while self.__running:
+            self.__wakeup.clear()
+            try:
+                period = self.step()
+            except DynamixelError as e:
+                # e.g. a timeout or a corrupted status packet, the poller backs off to the idle rate and keeps polling
+                print("Failed to poll the gripper status: {}".format(e))
+                self.__errors += 1
+                self.__last_error = e
+                period = self.__idle_period
+            next_step = max(next_step + period, time.monotonic())
+            # queued writes end the wait early, such that commands are not delayed by the idle rate
+            if self.__wakeup.wait(max(0.0, next_step - time.monotonic())):
+                next_step = time.monotonic()
+
+    def start(self):
+        """
+        Polls in a background thread.
+        """
+        self.__thread = threading.Thread(target=self.run, daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        self.__running = False
+        self.__wakeup.set()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+    @property
+    def connector(self) -> DynamixelConnector:
+        return self.__connector
+
+    @property
+    def status_fields(self) -> List[str]:
+        return self.__status_fields
+
+    @property
+    def active(self) -> bool:
+        return time.monotonic() - self.__last_motion < self.__idle_delay
+
+    @property
+    def status(self) -> Dict[str, int]:
+        """
+        Most recent full status.
+        """
+        return self.__status
+
+    @property
+    def status_time(self) -> float:
+        """
+        Host time (time.monotonic) at which the most recent full status was read.
+        """
+        return self.__status_time
+
+    @property
+    def status_reads(self) -> int:
+        return self.__status_reads
+
+    @property
+    def probe_reads(self) -> int:
+        return self.__probe_reads
+
+    @property
+    def writes(self) -> int:
+        return self.__writes
+
+    @property
+    def errors(self) -> int:
+        """
+        Number of steps of run that failed with a DynamixelError.
+        """
+        return self.__errors
+
+    @property
+    def last_error(self) -> Optional[DynamixelError]:
+        """
+        Most recent error of a step of run or None if no step has failed yet.
+        """
+        return self.__last_error
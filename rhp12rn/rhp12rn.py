@@ -22,24 +22,111 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 
-from typing import Union, Any
+from contextlib import contextmanager
+from typing import Union, Any, Dict, Iterable, Iterator, Optional, Set, List, Tuple
 
 from .rhp12rna_connector import RHP12RNAConnector
 from .rhp12rn_connector import RHP12RNConnector
+from .units import Units
 
 
 class RHP12RN:
     def __init__(self, connector: Union[RHP12RNConnector, RHP12RNAConnector]):
         self.__connector = connector
+        # values read and writes recorded during a batch, None outside of a batch
+        self.__batch_values: Optional[Dict[str, int]] = None
+        self.__batch_writes: Optional[List[Tuple[str, int]]] = None
+        self.__batch_fields: Set[str] = set()
+        # fields read in the previous batch, which are prefetched with the first read of the next batch
+        self.__learned_fields: Set[str] = set()
+        self.__batch_reads: Set[str] = set()
+        self.__units: Optional[Units] = None
 
     def __read(self, field_name: str):
-        return self.__connector.read_field(field_name)
+        if self.__batch_values is None:
+            return self.__connector.read_field(field_name)
+        self.__batch_reads.add(field_name)
+        for written_field, value in reversed(self.__batch_writes):
+            if written_field == field_name:
+                return value
+        if field_name not in self.__batch_values:
+            fields = (self.__batch_fields | self.__learned_fields | {field_name}) - set(self.__batch_values)
+            self.__batch_values.update(self.__connector.read_fields(sorted(fields)))
+        return self.__batch_values[field_name]
 
     def __group_read(self):
         return self.__connector.group_read()
 
     def __write(self, field_name: str, value: Any):
-        self.__connector.write_field(field_name, int(value))
+        if self.__batch_writes is None:
+            self.__connector.write_field(field_name, int(value))
+        else:
+            self.__batch_writes.append((field_name, int(value)))
+
+    @contextmanager
+    def batch(self, fields: Iterable[str] = ()) -> Iterator["RHP12RN"]:
+        """
+        Within the context, property reads are served from a single snapshot, which is fetched with the fewest block
+        reads when the first property is read. The snapshot contains the given fields and all fields read in the previous
+        batch, hence a loop body reading the same properties in every iteration makes a single round trip after the
+        first iteration. Property writes are recorded and sent in the order they were made when the body exits without
+        an exception, where consecutive writes to adjacent addresses are merged into one write instruction. Writes to
+        torque_enable are sent on their own, after all preceding writes have been acknowledged.
+        :param fields: Fields to include in the snapshot in any case.
+        :return: The gripper itself.
+        """
+        if self.__batch_values is not None:
+            # nested batches share the snapshot of the outer batch
+            yield self
+            return
+        self.__batch_values, self.__batch_writes, self.__batch_fields = {}, [], set(fields)
+        self.__batch_reads = set()
+        try:
+            yield self
+        except BaseException:
+            # the recorded writes are discarded if the body failed
+            self.__batch_values = self.__batch_writes = None
+            raise
+        finally:
+            # only the fields of the last batch are remembered, such that fields a loop stopped using are not prefetched
+            # forever
+            self.__learned_fields = self.__batch_reads
+        writes = self.__batch_writes
+        self.__batch_values = self.__batch_writes = None
+        self.__flush(writes)
+
+    @contextmanager
+    def snapshot(self, *fields: str) -> Iterator["RHP12RN"]:
+        """
+        Same as batch, but reads the given fields right away.
+        """
+        with self.batch(fields):
+            if len(fields) > 0:
+                self.__read(fields[0])
+            yield self
+
+    def __flush(self, writes: List[Tuple[str, int]]):
+        # Writes are split into segments at writes to torque_enable, since EEPROM fields are only writable while torque is
+        # disabled. Each segment is acknowledged before the next one is sent.
+        segments: List[List[Tuple[str, int]]] = [[]]
+        for field_name, value in writes:
+            if field_name == "torque_enable":
+                segments += [[(field_name, value)], []]
+            else:
+                segments[-1].append((field_name, value))
+        for segment in segments:
+            if len(segment) > 0:
+                self.__connector.write_batch(segment)
+
+    @property
+    def units(self) -> Units:
+        """
+        Unit conversions of the gripper model. The limits are read once and cached until they are changed through this
+        object.
+        """
+        if self.__units is None:
+            self.__units = Units.for_connector(self.__connector)
+        return self.__units
 
     def __to_rel(self, value, min, max):
         return (value - min) / (max - min)
@@ -58,10 +145,12 @@ class RHP12RN:
     @position_limit_low.setter
     def position_limit_low(self, value: int):
         self.__write("min_position_limit", value)
+        self.__units = None
 
     @position_limit_high.setter
     def position_limit_high(self, value: int):
         self.__write("max_position_limit", value)
+        self.__units = None
 
     @property
     def velocity_limit(self):
@@ -70,6 +159,7 @@ class RHP12RN:
     @velocity_limit.setter
     def velocity_limit(self, value: int):
         self.__write("velocity_limit", value)
+        self.__units = None
 
     @property
     def acceleration_limit(self):
@@ -23,10 +23,13 @@ SOFTWARE.
 """
 
 import warnings
+from typing import Type, List, Optional
 
-from .dynamixel_connector import DynamixelConnector, Field
+from dynamixel_sdk import PortHandler
 
-RHP12RN_EEPROM_FIELDS = [
+from .dynamixel_connector import DynamixelConnector, Field, RetryPolicy
+
+_RHP12RN_EEPROM_BASE_FIELDS = [
     Field(0, "H", "model_number", "Model Number", False, 35073),
     Field(2, "i", "model_information", "Model Information", False, None),
     Field(6, "B", "firmware_version", "Firmware Version", False, None),
@@ -50,12 +53,7 @@ RHP12RN_EEPROM_FIELDS = [
     Field(48, "B", "shutdown", "Shutdown Error Information", True, 48)
 ]
 
-RHP12RN_EEPROM_FIELDS += [
-    Field(49 + i * 2, "H", "indirect_address_{}".format(i + 1), "Indirect Address {}".format(i + 1), True, 634 + i)
-    for i in range(256)
-]
-
-RHP12RN_RAM_FIELDS = [
+_RHP12RN_RAM_BASE_FIELDS = [
     Field(562, "B", "torque_enable", "Motor Torque On/Off", True, 0),
     Field(563, "B", "led_red", "Red LED Intensity Value", True, 0),
     Field(564, "B", "led_green", "Green LED Intensity Value", True, 0),
@@ -79,23 +77,54 @@ RHP12RN_RAM_FIELDS = [
     Field(632, "H", "external_port_data_4", "External Port Data 4", True, 0)
 ]
 
-RHP12RN_RAM_FIELDS += [
-    Field(634 + i, "B", "indirect_data_{}".format(i + 1), "Indirect Data {}".format(i + 1), True, 0) for i in range(256)
-]
-
-RHP12RN_RAM_FIELDS += [
+_RHP12RN_RAM_TAIL_FIELDS = [
     Field(890, "B", "registered_instruction", "Check Reception of Instruction", False, 0),
     Field(891, "B", "status_return_level", "Select Types of Status Return", True, 2),
     Field(892, "B", "hardware_error_status", "Hardware Error Status", False, 0)
 ]
 
-RHP12RN_FIELDS = RHP12RN_EEPROM_FIELDS + RHP12RN_RAM_FIELDS
+
+# The indirect address and data fields make up most of the control table, hence the complete tables are only generated
+# when they are accessed for the first time (see __getattr__)
+def _indirect_address_fields() -> List[Field]:
+    return [
+        Field(49 + i * 2, "H", "indirect_address_{}".format(i + 1), "Indirect Address {}".format(i + 1), True, 634 + i)
+        for i in range(256)
+    ]
+
+
+def _indirect_data_fields() -> List[Field]:
+    return [
+        Field(634 + i, "B", "indirect_data_{}".format(i + 1), "Indirect Data {}".format(i + 1), True, 0)
+        for i in range(256)
+    ]
+
+
+_TABLE_FACTORIES = {
+    "RHP12RN_EEPROM_FIELDS": lambda: _RHP12RN_EEPROM_BASE_FIELDS + _indirect_address_fields(),
+    "RHP12RN_RAM_FIELDS": lambda: _RHP12RN_RAM_BASE_FIELDS + _indirect_data_fields() + _RHP12RN_RAM_TAIL_FIELDS,
+    "RHP12RN_FIELDS": lambda: _table("RHP12RN_EEPROM_FIELDS") + _table("RHP12RN_RAM_FIELDS")
+}
+
+
+def _table(name: str) -> List[Field]:
+    if name not in globals():
+        globals()[name] = _TABLE_FACTORIES[name]()
+    return globals()[name]
+
+
+def __getattr__(name: str):
+    if name in _TABLE_FACTORIES:
+        return _table(name)
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
 
 
 class RHP12RNConnector(DynamixelConnector):
-    def __init__(self, device: str = "/dev/ttyUSB0", baud_rate: int = 57600, dynamixel_id: int = 1):
+    def __init__(self, device: str = "/dev/ttyUSB0", baud_rate: int = 57600, dynamixel_id: int = 1,
+                 port_handler_type: Type[PortHandler] = PortHandler, retry_policy: Optional[RetryPolicy] = None):
         super(RHP12RNConnector, self).__init__(
-            RHP12RN_FIELDS, device=device, baud_rate=baud_rate, dynamixel_id=dynamixel_id)
+            _table("RHP12RN_FIELDS"), device=device, baud_rate=baud_rate, dynamixel_id=dynamixel_id,
+            port_handler_type=port_handler_type, retry_policy=retry_policy)
 
     def connect(self):
         super(RHP12RNConnector, self).connect()
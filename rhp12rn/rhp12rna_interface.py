@@ -25,52 +25,66 @@ SOFTWARE.
 import time
 import numpy as np
 
-from rhp12rn import RHP12RN, RHP12RNAConnector
+from rhp12rn import RHP12RN, RHP12RNAConnector, RetryPolicy
+from rhp12rn.units import to_unsigned16
+from rhp12rn.configuration import GripperConfiguration, apply_configuration, POSITION_CONTROL_MODE, \
+    CURRENT_CONTROL_MODE
 
 class RHP12RNAInterface:
     # Initialise the gripper
-    def __init__(self, mode='position'):
+    def __init__(self, mode='position', device="/dev/ttyUSB0", baud_rate=2000000, dynamixel_id=1):
         # Connect to the gripper - in our setup, the baudrate is 2M
-        self.connector = RHP12RNAConnector(device="/dev/ttyUSB0", baud_rate=2000000, dynamixel_id=1)
+        self.connector = RHP12RNAConnector(device=device, baud_rate=baud_rate, dynamixel_id=dynamixel_id)
         self.connector.connect()
         self.gripper = RHP12RN(self.connector)
 
-        # Standard gripper setup - must be done when torque is disabled
-        self.gripper.torque_enabled = False
-        self.gripper.position_limit_high = 660
-        self.pos_limit_high = self.gripper.position_limit_high
-        self.pos_limit_low = self.gripper.position_limit_low
-
         # determine operating mode
         self.mode = mode
         if self.mode == 'position':
-            self.position_control_setup()
+            configuration = self.position_control_configuration()
         elif self.mode == 'current':
-            self.current_control_setup()
+            configuration = self.current_control_configuration()
         else:
             raise Exception("Mode not recognised. Please choose position or current.")
 
-
-        self.gripper.torque_enabled = True
+        # Standard gripper setup - only fields that differ are written and torque is only disabled if EEPROM fields have
+        # to be changed, so restarting with an already configured gripper takes a single round trip
+        values = apply_configuration(
+            self.connector, configuration._replace(position_limit_high=660, torque_enabled=True),
+            extra_fields=["min_position_limit"])
+        self.pos_limit_high = values["max_position_limit"]
+        self.pos_limit_low = values["min_position_limit"]
         print("Enabled motor.")
 
-    def position_control_setup(self, gain=50):
-        self.gripper.enable_position_control()
+    @staticmethod
+    def position_control_configuration(gain=50):
         # Set P gain - note the original value was 193
-        self.gripper.position_p_gain = gain
+        return GripperConfiguration(operating_mode=POSITION_CONTROL_MODE, position_p_gain=gain)
+
+    @staticmethod
+    def current_control_configuration():
+        return GripperConfiguration(operating_mode=CURRENT_CONTROL_MODE, goal_current=0)
+
+    def position_control_setup(self, gain=50):
+        apply_configuration(self.connector, self.position_control_configuration(gain))
+        print("Position control enabled")
 
     def current_control_setup(self):
-        self.gripper.enable_current_control()
-        self.gripper.goal_current = 0
+        apply_configuration(self.connector, self.current_control_configuration())
+        print("Current control enabled")
+
+    def current_position_rel(self):
+        # uses the limits read on start, such that only the position has to be read
+        return (self.gripper.current_position - self.pos_limit_low) / (self.pos_limit_high - self.pos_limit_low)
 
     def open(self):
-        self.gripper.goal_position_rel = 0.0
-        while self.gripper.current_position_rel > 0.05:
+        self.gripper.goal_position = self.pos_limit_low
+        while self.current_position_rel() > 0.05:
             time.sleep(0.01)
         print("Gripper fully opened.")
 
     def open_constant_current(self):
-        while self.gripper.current_position_rel > 0.05:
+        while self.current_position_rel() > 0.05:
             self.constant_current(-50)
             time.sleep(0.01)
         # brings the gripper to a stop
@@ -118,10 +132,8 @@ class RHP12RNAInterface:
         self.gripper.goal_current = self.convert_current(value)
 
     def convert_current(self, value):
-        # conversion is needed as the field assumes unsigned value!
-        if value < 0:
-            value = 65536 + value
-        return value
+        # conversion is needed as the field assumes unsigned value! Also accepts numpy arrays.
+        return to_unsigned16(value)
 
     def read_status(self):
         return self.gripper.read_gripper_status
@@ -150,20 +162,17 @@ class RHP12RNAInterface:
                 break
             # print ("Iteration took ", time.time()-start_iter)
 
-    def shutdown(self):
-        # reason for while loop: depending on position in code, the port might be busy and the shutdown might fail
-        # thus, we try again after some wait (after which the port will be free) until it succeeds
-        while True:
-            try:
-                self.low_level_shutdown()
-                break
-            except:
-                print ("Failed to shutdown gripper, retrying...")
-                time.sleep(0.1)
+    def shutdown(self, timeout=1.0):
+        # depending on position in code, the shutdown might fail on the first attempt (e.g. because of a corrupted
+        # packet or a reconnecting adapter), thus, we retry with backoff - but only until the timeout has passed
+        try:
+            self.low_level_shutdown(RetryPolicy(max_attempts=20, deadline=timeout))
+        finally:
+            self.connector.disconnect()
 
-    def low_level_shutdown(self):
+    def low_level_shutdown(self, retry_policy=None):
         # Disable the gripper and disconnect
-        self.gripper.torque_enabled = False
+        self.connector.write_field("torque_enable", 0, retry_policy=retry_policy)
         print("Disabled motor.")
         self.connector.disconnect()
 
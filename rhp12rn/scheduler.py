@@ -0,0 +1,219 @@
+"""
+MIT License
+
+Copyright (c) 2021 Tim Schneider
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+
+from .dynamixel_connector import DynamixelConnector, RetryPolicy, Field
+
+# Priority classes of bus transactions, lower values are served first
+PRIORITY_EMERGENCY = 0
+PRIORITY_CONTROL = 1
+PRIORITY_TELEMETRY = 2
+PRIORITY_CONFIGURATION = 3
+PRIORITY_NAMES = {
+    PRIORITY_EMERGENCY: "emergency", PRIORITY_CONTROL: "control", PRIORITY_TELEMETRY: "telemetry",
+    PRIORITY_CONFIGURATION: "configuration"
+}
+
+
+class PriorityLock:
+    """
+    Reentrant lock that is handed to the waiting thread with the highest priority (lowest value) when it is released.
+    Threads of the same priority acquire the lock in the order in which they started waiting.
+    """
+
+    def __init__(self):
+        self.__condition = threading.Condition(threading.Lock())
+        self.__owner: Optional[int] = None
+        self.__depth = 0
+        self.__waiting = []
+        self.__tickets = itertools.count()
+
+    def acquire(self, priority: int) -> float:
+        """
+        :return: Time in s the calling thread waited for the lock.
+        """
+        thread = threading.get_ident()
+        with self.__condition:
+            if self.__owner == thread:
+                self.__depth += 1
+                return 0.0
+            entry = (priority, next(self.__tickets))
+            heapq.heappush(self.__waiting, entry)
+            start = time.perf_counter()
+            try:
+                while self.__owner is not None or self.__waiting[0] != entry:
+                    self.__condition.wait()
+            except BaseException:
+                # e.g. a KeyboardInterrupt, the entry must not block the waiters behind it
+                self.__waiting.remove(entry)
+                heapq.heapify(self.__waiting)
+                self.__condition.notify_all()
+                raise
+            heapq.heappop(self.__waiting)
+            self.__owner = thread
+            self.__depth = 1
+            return time.perf_counter() - start
+
+    def release(self):
+        with self.__condition:
+            if self.__owner != threading.get_ident():
+                raise RuntimeError("Cannot release a lock that is not held by the calling thread.")
+            self.__depth -= 1
+            if self.__depth == 0:
+                self.__owner = None
+                self.__condition.notify_all()
+
+    @property
+    def waiting(self) -> int:
+        """
+        Number of threads waiting for the lock.
+        """
+        return len(self.__waiting)
+
+
+class QueueMetrics:
+    """
+    Time transactions of one priority class waited for the bus.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.__transactions = 0
+        self.__total_wait = 0.0
+        self.__max_wait = 0.0
+
+    def _record(self, wait: float):
+        self.__transactions += 1
+        self.__total_wait += wait
+        self.__max_wait = max(self.__max_wait, wait)
+
+    @property
+    def transactions(self) -> int:
+        return self.__transactions
+
+    @property
+    def mean_wait(self) -> float:
+        return self.__total_wait / max(1, self.__transactions)
+
+    @property
+    def max_wait(self) -> float:
+        return self.__max_wait
+
+
+class ScheduledConnector:
+    """
+    Makes a connector safe to use from several threads. Every transaction holds the bus exclusively and threads waiting
+    for the bus are served in the order of the priority class of their transaction: emergency stops first, then control
+    writes, telemetry reads and finally configuration. Priorities are strict, so lower classes only get the bus when no
+    higher class is waiting, e.g. configuration waits while telemetry saturates the bus. Provides the read_field and
+    write_field interface of a connector, such that it can be wrapped in RHP12RN.
+    """
+
+    def __init__(self, connector: DynamixelConnector):
+        """
+        :param connector: Connector of the gripper. Must not be used directly while it is scheduled.
+        """
+        self.__connector = connector
+        self.__lock = PriorityLock()
+        self.__queue_metrics = {p: QueueMetrics() for p in PRIORITY_NAMES}
+
+    @contextmanager
+    def transaction(self, priority: int = PRIORITY_CONTROL) -> Iterator[DynamixelConnector]:
+        """
+        Holds the bus for a sequence of operations, e.g. pipelined asynchronous reads or apply_configuration. The
+        operations are executed on the yielded connector. Transactions can be nested within the same thread.
+        :param priority: Priority class of the transaction.
+        """
+        self.__queue_metrics[priority]._record(self.__lock.acquire(priority))
+        try:
+            yield self.__connector
+        finally:
+            self.__lock.release()
+
+    def read_field(self, field_name: str, priority: int = PRIORITY_TELEMETRY,
+                   retry_policy: Optional[RetryPolicy] = None) -> int:
+        with self.transaction(priority) as connector:
+            return connector.read_field(field_name, retry_policy=retry_policy)
+
+    def read_fields(self, field_names: Sequence[str], priority: int = PRIORITY_TELEMETRY,
+                    retry_policy: Optional[RetryPolicy] = None) -> Dict[str, int]:
+        with self.transaction(priority) as connector:
+            return connector.read_fields(field_names, retry_policy=retry_policy)
+
+    def write_field(self, field_name: str, value: int, priority: int = PRIORITY_CONTROL,
+                    retry_policy: Optional[RetryPolicy] = None):
+        with self.transaction(priority) as connector:
+            connector.write_field(field_name, value, retry_policy=retry_policy)
+
+    def write_fields(self, values: Dict[str, int], priority: int = PRIORITY_CONTROL,
+                     retry_policy: Optional[RetryPolicy] = None):
+        with self.transaction(priority) as connector:
+            connector.write_fields(values, retry_policy=retry_policy)
+
+    def write_batch(self, writes: Sequence[Tuple[str, int]], priority: int = PRIORITY_CONTROL,
+                    retry_policy: Optional[RetryPolicy] = None):
+        with self.transaction(priority) as connector:
+            connector.write_batch(writes, retry_policy=retry_policy)
+
+    def synchronized_write(self, values: Dict[int, Dict[str, int]], verify: bool = True,
+                           priority: int = PRIORITY_CONTROL, retry_policy: Optional[RetryPolicy] = None):
+        with self.transaction(priority) as connector:
+            connector.synchronized_write(values, verify=verify, retry_policy=retry_policy)
+
+    def group_read(self, priority: int = PRIORITY_TELEMETRY):
+        with self.transaction(priority) as connector:
+            return connector.group_read()
+
+    def emergency_stop(self, retry_policy: Optional[RetryPolicy] = RetryPolicy(max_attempts=20, deadline=1.0)):
+        """
+        Disables the torque of the gripper as the next transaction on the bus.
+        """
+        self.write_field("torque_enable", 0, priority=PRIORITY_EMERGENCY, retry_policy=retry_policy)
+
+    @property
+    def connector(self) -> DynamixelConnector:
+        return self.__connector
+
+    @property
+    def fields(self) -> Dict[str, Field]:
+        return self.__connector.fields
+
+    @property
+    def connected(self) -> bool:
+        return self.__connector.connected
+
+    @property
+    def queue_metrics(self) -> Dict[int, QueueMetrics]:
+        """
+        Time waited for the bus by priority class.
+        """
+        return self.__queue_metrics
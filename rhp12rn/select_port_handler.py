@@ -0,0 +1,68 @@
+"""
+MIT License
+
+Copyright (c) 2021 Tim Schneider
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import selectors
+
+from dynamixel_sdk import PortHandler
+
+
+class SelectPortHandler(PortHandler):
+    """
+    A port handler that allows blocking reads to sleep on the serial file descriptor (using epoll on Linux) instead of
+    polling readPort in a tight loop while waiting for a reply.
+    """
+
+    def __init__(self, port_name: str, latency_timer_ms: float = 16.0):
+        """
+        :param port_name: Device path of the serial port.
+        :param latency_timer_ms: Latency timer of the USB serial driver in ms (1ms if reduce_latency.sh has been run).
+        """
+        super(SelectPortHandler, self).__init__(port_name)
+        self.__latency_timer_ms = latency_timer_ms
+        self.__selector = None
+
+    def setupPort(self, cflag_baud):
+        result = super(SelectPortHandler, self).setupPort(cflag_baud)
+        self.__selector = selectors.DefaultSelector()
+        self.__selector.register(self.ser.fileno(), selectors.EVENT_READ)
+        return result
+
+    def closePort(self):
+        if self.__selector is not None:
+            self.__selector.close()
+            self.__selector = None
+        super(SelectPortHandler, self).closePort()
+
+    def waitReadable(self, length: int):
+        """
+        Blocks until data can be read from the port. The wait is bounded by the packet timeout and by the time it takes
+        to transfer the given number of bytes at the current baud rate plus the latency of the USB serial driver,
+        whichever is shorter.
+        :param length: Number of bytes that are still expected.
+        """
+        remaining_ms = self.packet_timeout - self.getTimeSinceStart()
+        expected_ms = self.tx_time_per_byte * length + self.__latency_timer_ms
+        timeout_ms = min(remaining_ms, expected_ms)
+        if timeout_ms > 0:
+            self.__selector.select(timeout_ms / 1000)
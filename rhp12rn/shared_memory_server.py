@@ -0,0 +1,357 @@
+"""
+MIT License
+
+Copyright (c) 2021 Tim Schneider
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import argparse
+import fcntl
+import json
+import os
+import struct
+import tempfile
+import threading
+import time
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Optional, Sequence, Dict, Tuple, List
+
+from .dynamixel_connector import DynamixelConnector, DynamixelError, GROUP_READ_FIELDS, group_read_result
+
+# Memory layout of the shared memory block:
+#   header:       magic, length of the JSON description
+#   description:  JSON object listing the published fields, the writable fields and the capacity of the command ring
+#   status block: sequence number (odd while the server is writing), host timestamp, one int64 per published field
+#   command ring: head (number of commands written), tail (number of commands consumed), slots of (field index, value)
+_MAGIC = b"RHPS"
+_HEADER = struct.Struct("<4sI")
+_STATUS_HEADER = struct.Struct("<Qd")
+_RING_HEADER = struct.Struct("<QQ")
+_COMMAND = struct.Struct("<Hxxxxxxq")
+_SEQUENCE = struct.Struct("<Q")
+
+DEFAULT_STATUS_FIELDS = (
+    "torque_enable", "hardware_error_status", "goal_current", "goal_position", "realtime_tick", "moving",
+    "moving_status", "present_pwm", "present_current", "present_velocity", "present_position", "present_temperature")
+DEFAULT_CONFIGURATION_FIELDS = (
+    "operating_mode", "min_position_limit", "max_position_limit", "velocity_limit", "acceleration_limit",
+    "position_p_gain", "position_i_gain", "position_d_gain")
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def _lock_file_path(name: str) -> str:
+    return os.path.join(tempfile.gettempdir(), "{}.lock".format(name))
+
+
+class _Layout:
+    def __init__(self, description: Dict):
+        self.description = description
+        self.published_fields: List[str] = description["published_fields"]
+        self.writable_fields: List[str] = description["writable_fields"]
+        self.ring_capacity: int = description["ring_capacity"]
+        self.description_bytes = json.dumps(description).encode()
+        self.values = struct.Struct("<{}q".format(len(self.published_fields)))
+        self.status_offset = _align(_HEADER.size + len(self.description_bytes))
+        self.values_offset = self.status_offset + _STATUS_HEADER.size
+        self.ring_offset = _align(self.values_offset + self.values.size)
+        self.slots_offset = self.ring_offset + _RING_HEADER.size
+        self.size = self.slots_offset + self.ring_capacity * _COMMAND.size
+
+
+class SharedMemoryStateServer:
+    """
+    Owns the bus of a gripper and periodically publishes its status into a named shared memory block protected by a
+    seqlock. Any number of processes can attach to the block with a SharedMemoryClient and read the latest status
+    without touching the bus or performing a single system call. Commands of the clients are passed to the server
+    through a ring buffer in the same block and are executed in the order they were submitted.
+    """
+
+    def __init__(self, connector: DynamixelConnector, name: str = "rhp12rn", rate: float = 200.0,
+                 status_fields: Optional[Sequence[str]] = None,
+                 configuration_fields: Optional[Sequence[str]] = None, ring_capacity: int = 64):
+        """
+        :param connector: Connected connector of the gripper.
+        :param name: Name of the shared memory block.
+        :param rate: Rate in Hz at which the status is published.
+        :param status_fields: Fields read in every cycle (in a single block read). Defaults to all fields of
+                              DEFAULT_STATUS_FIELDS provided by the gripper model.
+        :param configuration_fields: Fields read once on start and afterwards only updated when written by a client.
+                                     Defaults to DEFAULT_CONFIGURATION_FIELDS.
+        :param ring_capacity: Maximum number of pending commands.
+        """
+        if status_fields is None:
+            status_fields = [f for f in DEFAULT_STATUS_FIELDS if f in connector.fields]
+        if configuration_fields is None:
+            configuration_fields = [f for f in DEFAULT_CONFIGURATION_FIELDS if f in connector.fields]
+        self.__connector = connector
+        self.__name = name
+        self.__period = 1.0 / rate
+        self.__status_fields = list(status_fields)
+        self.__configuration_fields = [f for f in configuration_fields if f not in self.__status_fields]
+        self.__layout = _Layout({
+            "model_number": connector.fields["model_number"].initial_value,
+            "published_fields": self.__status_fields + self.__configuration_fields,
+            "writable_fields": [f.name for f in connector.fields.values() if f.writable],
+            "ring_capacity": ring_capacity
+        })
+        self.__values = {}
+        self.__shared_memory: Optional[SharedMemory] = None
+        self.__thread: Optional[threading.Thread] = None
+        self.__running = False
+
+    def open(self):
+        layout = self.__layout
+        self.__values = {f: 0 for f in layout.published_fields}
+        if len(self.__configuration_fields) > 0:
+            self.__values.update(self.__connector.read_fields(self.__configuration_fields))
+        self.__shared_memory = SharedMemory(name=self.__name, create=True, size=layout.size)
+        buf = self.__shared_memory.buf
+        buf[:layout.size] = bytes(layout.size)
+        _HEADER.pack_into(buf, 0, _MAGIC, len(layout.description_bytes))
+        buf[_HEADER.size:_HEADER.size + len(layout.description_bytes)] = layout.description_bytes
+        # Create the lock file used by the clients to serialize their access to the command ring
+        open(_lock_file_path(self.__name), "a").close()
+        self.__publish()
+
+    def close(self):
+        self.stop()
+        if self.__shared_memory is not None:
+            self.__shared_memory.close()
+            self.__shared_memory.unlink()
+            self.__shared_memory = None
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __publish(self):
+        layout = self.__layout
+        buf = self.__shared_memory.buf
+        sequence, = _SEQUENCE.unpack_from(buf, layout.status_offset)
+        _STATUS_HEADER.pack_into(buf, layout.status_offset, sequence + 1, time.time())
+        layout.values.pack_into(buf, layout.values_offset, *[self.__values[f] for f in layout.published_fields])
+        _SEQUENCE.pack_into(buf, layout.status_offset, sequence + 2)
+
+    def __execute_commands(self):
+        layout = self.__layout
+        buf = self.__shared_memory.buf
+        head, tail = _RING_HEADER.unpack_from(buf, layout.ring_offset)
+        for i in range(tail, head):
+            field_index, value = _COMMAND.unpack_from(
+                buf, layout.slots_offset + (i % layout.ring_capacity) * _COMMAND.size)
+            field_name = layout.writable_fields[field_index]
+            try:
+                self.__connector.write_field(field_name, value)
+                if field_name in self.__values:
+                    self.__values[field_name] = value
+            except DynamixelError as e:
+                print("Failed to write {}={}: {}".format(field_name, value, e))
+        # only the tail is written, as clients may advance the head concurrently
+        _SEQUENCE.pack_into(buf, layout.ring_offset + _SEQUENCE.size, head)
+
+    def step(self):
+        """
+        Executes all pending commands and publishes a new status snapshot.
+        """
+        self.__execute_commands()
+        if len(self.__status_fields) > 0:
+            self.__values.update(self.__connector.read_fields(self.__status_fields))
+        self.__publish()
+
+    def run(self):
+        """
+        Serves until stop is called.
+        """
+        self.__running = True
+        next_cycle = time.monotonic()
+        while self.__running:
+            try:
+                self.step()
+            except DynamixelError as e:
+                # e.g. a corrupted status packet, the next cycle reads the status again
+                print("Failed to serve {}: {}".format(self.__name, e))
+            next_cycle += self.__period
+            time.sleep(max(0.0, next_cycle - time.monotonic()))
+
+    def start(self):
+        """
+        Serves in a background thread.
+        """
+        self.__thread = threading.Thread(target=self.run, daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        self.__running = False
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+
+class SharedMemoryClient:
+    """
+    Provides the read_field and write_field interface of a connector on top of the shared memory block of a
+    SharedMemoryStateServer, such that it can be wrapped in RHP12RN, e.g. RHP12RN(SharedMemoryClient("rhp12rn")).
+    Reads return the latest published values and never touch the bus. Writes are queued for the server and return
+    immediately, hence errors during writing are only reported by the server.
+    """
+
+    def __init__(self, name: str = "rhp12rn"):
+        self.__name = name
+        self.__shared_memory: Optional[SharedMemory] = None
+        self.__layout: Optional[_Layout] = None
+        self.__published_indices: Dict[str, int] = {}
+        self.__writable_indices: Dict[str, int] = {}
+        self.__lock_file = None
+
+    def connect(self):
+        if not self.connected:
+            shared_memory = SharedMemory(name=self.__name)
+            # Clients must not remove the block when they exit, only the server does (see bpo-39959)
+            resource_tracker.unregister(shared_memory._name, "shared_memory")
+            magic, description_length = _HEADER.unpack_from(shared_memory.buf, 0)
+            if magic != _MAGIC:
+                shared_memory.close()
+                raise DynamixelError("Shared memory block {} was not created by a state server.".format(self.__name))
+            description = bytes(shared_memory.buf[_HEADER.size:_HEADER.size + description_length])
+            self.__layout = _Layout(json.loads(description.decode()))
+            self.__published_indices = {f: i for i, f in enumerate(self.__layout.published_fields)}
+            self.__writable_indices = {f: i for i, f in enumerate(self.__layout.writable_fields)}
+            self.__lock_file = open(_lock_file_path(self.__name), "a")
+            self.__shared_memory = shared_memory
+
+    def disconnect(self):
+        if self.connected:
+            self.__lock_file.close()
+            self.__shared_memory.close()
+            self.__shared_memory = None
+
+    def __enter__(self):
+        self.connect()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.disconnect()
+
+    def snapshot(self) -> Tuple[float, Dict[str, int]]:
+        """
+        Returns a consistent copy of the latest published status.
+        :return: Host time of publication and a dictionary mapping the published field names to their values.
+        """
+        if not self.connected:
+            raise DynamixelError("Client is not connected.")
+        layout = self.__layout
+        buf = self.__shared_memory.buf
+        while True:
+            sequence, timestamp = _STATUS_HEADER.unpack_from(buf, layout.status_offset)
+            if sequence % 2 == 1:
+                continue
+            values = layout.values.unpack_from(buf, layout.values_offset)
+            if _SEQUENCE.unpack_from(buf, layout.status_offset)[0] == sequence:
+                return timestamp, dict(zip(layout.published_fields, values))
+
+    def read_field(self, field_name: str) -> int:
+        if field_name not in self.__published_indices:
+            raise DynamixelError("Field {} is not published by the state server.".format(field_name))
+        return self.snapshot()[1][field_name]
+
+    def read_fields(self, field_names: Sequence[str]) -> Dict[str, int]:
+        missing = [f for f in field_names if f not in self.__published_indices]
+        if len(missing) > 0:
+            raise DynamixelError("Fields {} are not published by the state server.".format(", ".join(missing)))
+        values = self.snapshot()[1]
+        return {f: values[f] for f in field_names}
+
+    def write_field(self, field_name: str, value: int):
+        self.write_batch([(field_name, value)])
+
+    def write_batch(self, writes: Sequence[Tuple[str, int]]):
+        """
+        Queues the writes in order. Either all of them are queued or, if the command ring is full, none.
+        """
+        if not self.connected:
+            raise DynamixelError("Client is not connected.")
+        for field_name, _ in writes:
+            if field_name not in self.__writable_indices:
+                raise DynamixelError("Field {} is not writable.".format(field_name))
+        layout = self.__layout
+        buf = self.__shared_memory.buf
+        fcntl.flock(self.__lock_file, fcntl.LOCK_EX)
+        try:
+            head, tail = _RING_HEADER.unpack_from(buf, layout.ring_offset)
+            if head + len(writes) - tail > layout.ring_capacity:
+                raise DynamixelError("Command ring of the state server is full.")
+            for field_name, value in writes:
+                _COMMAND.pack_into(buf, layout.slots_offset + (head % layout.ring_capacity) * _COMMAND.size,
+                                   self.__writable_indices[field_name], int(value))
+                head += 1
+            # the head is published last, such that the server never sees a partially written batch
+            _SEQUENCE.pack_into(buf, layout.ring_offset, head)
+        finally:
+            fcntl.flock(self.__lock_file, fcntl.LOCK_UN)
+
+    def group_read(self):
+        missing = [f for f in GROUP_READ_FIELDS if f not in self.__published_indices]
+        if len(missing) > 0:
+            raise DynamixelError("group_read requires the state server to publish {}, but {} are missing.".format(
+                ", ".join(GROUP_READ_FIELDS), ", ".join(missing)))
+        return group_read_result(self.read_fields(GROUP_READ_FIELDS))
+
+    @property
+    def connected(self) -> bool:
+        return self.__shared_memory is not None
+
+    @property
+    def published_fields(self) -> List[str]:
+        return self.__layout.published_fields
+
+
+def main():
+    from .rhp12rn_connector import RHP12RNConnector
+    from .rhp12rna_connector import RHP12RNAConnector
+
+    parser = argparse.ArgumentParser(description="Owns the bus of a RH-P12-RN[(A)] gripper and publishes its status to "
+                                                 "shared memory.")
+    parser.add_argument("--model", choices=["rhp12rn", "rhp12rna"], default="rhp12rna")
+    parser.add_argument("--device", default="/dev/ttyUSB0")
+    parser.add_argument("--baud-rate", type=int, default=57600)
+    parser.add_argument("--id", type=int, default=1)
+    parser.add_argument("--name", default="rhp12rn", help="Name of the shared memory block.")
+    parser.add_argument("--rate", type=float, default=200.0, help="Publishing rate in Hz.")
+    args = parser.parse_args()
+
+    connector_type = RHP12RNConnector if args.model == "rhp12rn" else RHP12RNAConnector
+    with connector_type(device=args.device, baud_rate=args.baud_rate, dynamixel_id=args.id) as connector:
+        with SharedMemoryStateServer(connector, name=args.name, rate=args.rate) as server:
+            print("Publishing status of {} to shared memory block {}.".format(args.device, args.name))
+            try:
+                server.run()
+            except KeyboardInterrupt:
+                pass
+
+
+if __name__ == "__main__":
+    main()
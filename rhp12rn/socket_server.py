@@ -0,0 +1,385 @@
+"""
+MIT License
+
+Copyright (c) 2021 Tim Schneider
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import argparse
+import os
+import selectors
+import socket
+import struct
+import time
+from typing import Optional, Sequence, Dict, List, Tuple
+
+from .dynamixel_connector import DynamixelConnector, DynamixelError, GROUP_READ_FIELDS, group_read_result
+
+# Every message (request and response) starts with a header containing an opcode (request) or status (response) and the
+# length of the payload. Field names are exchanged once during the handshake, afterwards fields are referred to by their
+# index in the control table of the server.
+#   HELLO request:  empty                          response: model number (H), newline separated field names
+#   READ request:   field indices (H each)         response: values (q each)
+#   WRITE request:  field indices and values (Hq)  response: empty
+# If a request fails, the response has status STATUS_ERROR and contains the error message.
+_HEADER = struct.Struct("<BI")
+_MODEL_NUMBER = struct.Struct("<H")
+_FIELD_INDEX = struct.Struct("<H")
+_VALUE = struct.Struct("<q")
+_WRITE = struct.Struct("<Hq")
+
+OP_HELLO = 0
+OP_READ = 1
+OP_WRITE = 2
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+DEFAULT_SOCKET_PATH = "/tmp/rhp12rn.sock"
+
+
+class _Client:
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.buffer = bytearray()
+
+    def send(self, status: int, payload: bytes = b""):
+        self.sock.sendall(_HEADER.pack(status, len(payload)) + payload)
+
+
+class GripperServer:
+    """
+    Exposes the fields of a gripper to local clients over a Unix domain socket. Requests of all clients are collected
+    and executed once per cycle: writes are executed in the order they were received, where writes to the same goal_*
+    setpoint are collapsed to the latest value (last writer wins), and all reads are merged into a single block read,
+    such that the load on the bus stays flat as the number of clients grows.
+    """
+
+    def __init__(self, connector: DynamixelConnector, path: str = DEFAULT_SOCKET_PATH, cycle_time: float = 0.001):
+        """
+        :param connector: Connected connector of the gripper.
+        :param path: Path of the Unix domain socket.
+        :param cycle_time: Minimum time in s between two cycles. Requests arriving in between are merged.
+        """
+        self.__connector = connector
+        self.__path = path
+        self.__cycle_time = cycle_time
+        self.__field_names = list(connector.fields)
+        self.__selector: Optional[selectors.BaseSelector] = None
+        self.__server_socket: Optional[socket.socket] = None
+        self.__pending_reads: List[Tuple[_Client, List[int]]] = []
+        self.__pending_writes: List[Tuple[int, int]] = []
+        self.__pending_write_clients: List[Tuple[_Client, List[int]]] = []
+        self.__running = False
+        self.__bus_reads = self.__bus_writes = self.__read_requests = self.__write_requests = 0
+
+    def open(self):
+        if os.path.exists(self.__path):
+            os.unlink(self.__path)
+        self.__server_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.__server_socket.bind(self.__path)
+        self.__server_socket.listen()
+        self.__selector = selectors.DefaultSelector()
+        self.__selector.register(self.__server_socket, selectors.EVENT_READ)
+
+    def close(self):
+        if self.__selector is not None:
+            for key in list(self.__selector.get_map().values()):
+                key.fileobj.close()
+            self.__selector.close()
+            self.__selector = None
+            self.__server_socket = None
+            os.unlink(self.__path)
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __drop(self, client: _Client):
+        if client.sock.fileno() < 0:
+            # dropped already
+            return
+        self.__selector.unregister(client.sock)
+        client.sock.close()
+        self.__pending_reads = [(c, f) for c, f in self.__pending_reads if c is not client]
+        self.__pending_write_clients = [(c, f) for c, f in self.__pending_write_clients if c is not client]
+
+    def __receive(self, client: _Client):
+        data = client.sock.recv(65536)
+        if len(data) == 0:
+            self.__drop(client)
+            return
+        client.buffer += data
+        while len(client.buffer) >= _HEADER.size:
+            op, length = _HEADER.unpack_from(client.buffer)
+            if len(client.buffer) < _HEADER.size + length:
+                break
+            payload = bytes(client.buffer[_HEADER.size:_HEADER.size + length])
+            del client.buffer[:_HEADER.size + length]
+            if op == OP_HELLO:
+                model_number = self.__connector.fields["model_number"].initial_value
+                client.send(STATUS_OK, _MODEL_NUMBER.pack(model_number) + "\n".join(self.__field_names).encode())
+            elif op == OP_READ:
+                self.__read_requests += 1
+                if not self.__check_request(client, payload, _FIELD_INDEX):
+                    continue
+                indices = [i for i, in _FIELD_INDEX.iter_unpack(payload)]
+                self.__pending_reads.append((client, indices))
+            elif op == OP_WRITE:
+                self.__write_requests += 1
+                if not self.__check_request(client, payload, _WRITE):
+                    continue
+                writes = list(_WRITE.iter_unpack(payload))
+                for index, value in writes:
+                    if self.__field_names[index].startswith("goal_"):
+                        # only the latest setpoint is sent, other writes (e.g. torque_enable and EEPROM fields) are
+                        # executed in order, including intermediate values
+                        self.__pending_writes = [w for w in self.__pending_writes if w[0] != index]
+                    self.__pending_writes.append((index, value))
+                self.__pending_write_clients.append((client, [i for i, _ in writes]))
+            else:
+                client.send(STATUS_ERROR, "Unknown opcode {}.".format(op).encode())
+
+    def __check_request(self, client: _Client, payload: bytes, item: struct.Struct) -> bool:
+        # a malformed request is rejected for the sending client only, such that it cannot affect the other clients
+        if len(payload) % item.size != 0:
+            client.send(STATUS_ERROR, "Malformed request of {} bytes.".format(len(payload)).encode())
+            return False
+        invalid = [i for i, *_ in item.iter_unpack(payload) if i >= len(self.__field_names)]
+        if len(invalid) > 0:
+            client.send(STATUS_ERROR, "Unknown field indices {}.".format(invalid).encode())
+            return False
+        return True
+
+    def __send(self, client: _Client, status: int, payload: bytes = b""):
+        # a client that disconnected after submitting its request is dropped without affecting the other clients
+        try:
+            client.send(status, payload)
+        except OSError:
+            self.__drop(client)
+
+    def __execute(self):
+        errors = {}
+        for index, value in self.__pending_writes:
+            try:
+                self.__connector.write_field(self.__field_names[index], value)
+                self.__bus_writes += 1
+            except (DynamixelError, struct.error) as e:
+                errors[index] = str(e)
+        for client, indices in self.__pending_write_clients:
+            client_errors = [errors[i] for i in indices if i in errors]
+            if len(client_errors) > 0:
+                self.__send(client, STATUS_ERROR, "\n".join(client_errors).encode())
+            else:
+                self.__send(client, STATUS_OK)
+        self.__pending_writes = []
+        self.__pending_write_clients = []
+
+        if len(self.__pending_reads) > 0:
+            indices = sorted({i for _, request in self.__pending_reads for i in request})
+            try:
+                values = self.__connector.read_fields([self.__field_names[i] for i in indices])
+                self.__bus_reads += 1
+            except DynamixelError as e:
+                for client, _ in self.__pending_reads:
+                    self.__send(client, STATUS_ERROR, str(e).encode())
+            else:
+                for client, request in self.__pending_reads:
+                    self.__send(client, STATUS_OK,
+                                b"".join(_VALUE.pack(values[self.__field_names[i]]) for i in request))
+            self.__pending_reads = []
+
+    def step(self, timeout: Optional[float] = None):
+        """
+        Receives the requests that arrive within the given timeout and executes them.
+        """
+        for key, _ in self.__selector.select(timeout):
+            if key.fileobj is self.__server_socket:
+                sock, _ = self.__server_socket.accept()
+                self.__selector.register(sock, selectors.EVENT_READ, _Client(sock))
+            else:
+                try:
+                    self.__receive(key.data)
+                except OSError:
+                    self.__drop(key.data)
+        self.__execute()
+
+    def run(self):
+        """
+        Serves until stop is called.
+        """
+        self.__running = True
+        while self.__running:
+            cycle_start = time.monotonic()
+            self.step(timeout=0.1)
+            time.sleep(max(0.0, cycle_start + self.__cycle_time - time.monotonic()))
+
+    def stop(self):
+        self.__running = False
+
+    @property
+    def bus_reads(self) -> int:
+        return self.__bus_reads
+
+    @property
+    def bus_writes(self) -> int:
+        return self.__bus_writes
+
+    @property
+    def read_requests(self) -> int:
+        return self.__read_requests
+
+    @property
+    def write_requests(self) -> int:
+        return self.__write_requests
+
+
+class GripperClient:
+    """
+    Provides the read_field and write_field interface of a connector on top of a connection to a GripperServer, such
+    that it can be wrapped in RHP12RN, e.g. RHP12RN(GripperClient()).
+    """
+
+    def __init__(self, path: str = DEFAULT_SOCKET_PATH, timeout: Optional[float] = 5.0):
+        """
+        :param path: Path of the Unix domain socket of the server.
+        :param timeout: Time in s to wait for a response of the server or None to wait indefinitely.
+        """
+        self.__path = path
+        self.__timeout = timeout
+        self.__socket: Optional[socket.socket] = None
+        self.__field_indices: Dict[str, int] = {}
+        self.__model_number = None
+
+    def connect(self):
+        if not self.connected:
+            self.__socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.__socket.settimeout(self.__timeout)
+            try:
+                self.__socket.connect(self.__path)
+                payload = self.__request(OP_HELLO)
+            except OSError as e:
+                self.__socket.close()
+                self.__socket = None
+                raise DynamixelError("Failed to connect to gripper server at {}: {}".format(self.__path, e))
+            self.__model_number, = _MODEL_NUMBER.unpack_from(payload)
+            field_names = payload[_MODEL_NUMBER.size:].decode().split("\n")
+            self.__field_indices = {f: i for i, f in enumerate(field_names)}
+
+    def disconnect(self):
+        if self.connected:
+            self.__socket.close()
+            self.__socket = None
+
+    def __enter__(self):
+        self.connect()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.disconnect()
+
+    def __receive_exactly(self, length: int) -> bytes:
+        data = bytearray()
+        while len(data) < length:
+            chunk = self.__socket.recv(length - len(data))
+            if len(chunk) == 0:
+                raise DynamixelError("Connection to gripper server closed.")
+            data += chunk
+        return bytes(data)
+
+    def __request(self, op: int, payload: bytes = b"") -> bytes:
+        if self.__socket is None:
+            raise DynamixelError("Client is not connected.")
+        try:
+            self.__socket.sendall(_HEADER.pack(op, len(payload)) + payload)
+            status, length = _HEADER.unpack(self.__receive_exactly(_HEADER.size))
+            response = self.__receive_exactly(length)
+        except OSError as e:
+            raise DynamixelError("Communication with gripper server failed: {}".format(e))
+        if status != STATUS_OK:
+            raise DynamixelError(response.decode())
+        return response
+
+    def __index(self, field_name: str) -> int:
+        if field_name not in self.__field_indices:
+            raise DynamixelError("Unknown field {}.".format(field_name))
+        return self.__field_indices[field_name]
+
+    def read_fields(self, field_names: Sequence[str]) -> Dict[str, int]:
+        payload = b"".join(_FIELD_INDEX.pack(self.__index(f)) for f in field_names)
+        response = self.__request(OP_READ, payload)
+        return {f: v for f, (v,) in zip(field_names, _VALUE.iter_unpack(response))}
+
+    def read_field(self, field_name: str) -> int:
+        return self.read_fields([field_name])[field_name]
+
+    def write_batch(self, writes: Sequence[Tuple[str, int]]):
+        """
+        Sends the writes in a single request, the server executes them in order.
+        """
+        self.__request(OP_WRITE, b"".join(_WRITE.pack(self.__index(f), int(v)) for f, v in writes))
+
+    def write_fields(self, values: Dict[str, int]):
+        self.write_batch(list(values.items()))
+
+    def write_field(self, field_name: str, value: int):
+        self.write_fields({field_name: value})
+
+    def group_read(self):
+        return group_read_result(self.read_fields(GROUP_READ_FIELDS))
+
+    @property
+    def connected(self) -> bool:
+        return self.__socket is not None
+
+    @property
+    def model_number(self) -> int:
+        return self.__model_number
+
+
+def main():
+    from .rhp12rn_connector import RHP12RNConnector
+    from .rhp12rna_connector import RHP12RNAConnector
+
+    parser = argparse.ArgumentParser(description="Serves a RH-P12-RN[(A)] gripper to local clients over a Unix domain "
+                                                 "socket.")
+    parser.add_argument("--model", choices=["rhp12rn", "rhp12rna"], default="rhp12rna")
+    parser.add_argument("--device", default="/dev/ttyUSB0")
+    parser.add_argument("--baud-rate", type=int, default=57600)
+    parser.add_argument("--id", type=int, default=1)
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH, help="Path of the Unix domain socket.")
+    parser.add_argument("--cycle-time", type=float, default=0.001, help="Minimum cycle time in s.")
+    args = parser.parse_args()
+
+    connector_type = RHP12RNConnector if args.model == "rhp12rn" else RHP12RNAConnector
+    with connector_type(device=args.device, baud_rate=args.baud_rate, dynamixel_id=args.id) as connector:
+        with GripperServer(connector, path=args.socket, cycle_time=args.cycle_time) as server:
+            print("Serving {} at {}.".format(args.device, args.socket))
+            try:
+                server.run()
+            except KeyboardInterrupt:
+                pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+MIT License
+
+Copyright (c) 2021 Tim Schneider
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import json
+import os
+import threading
+from collections import deque
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+# A trace hook is called with the stage name and the start and end timestamps (time.perf_counter_ns) of the stage.
+# Instantaneous stages are reported with start == end.
+TraceHook = Callable[[str, int, int], None]
+
+# Stages of a transaction in the order in which they occur
+TX_WAIT = "tx_wait"  # sleep enforcing the minimum time between two transmissions
+TX_BUILD = "tx_build"  # byte stuffing, header and CRC of the instruction packet
+TX_WRITE = "tx_write"  # writing the instruction packet to the serial port
+FIRST_BYTE = "first_byte"  # first byte of the status packet received (instant)
+PACKET_COMPLETE = "packet_complete"  # status packet received completely (instant)
+CRC = "crc"  # CRC check of the status packet
+DECODE = "decode"  # conversion of the parameters into field values
+RESOLVE = "resolve"  # future resolved (instant)
+RESULT_WAIT = "result_wait"  # time a caller of result() was blocked waiting for the status packet
+
+TraceSpan = NamedTuple("TraceSpan", (("stage", str), ("start_ns", int), ("end_ns", int), ("thread_id", int)))
+
+
+class TraceRecorder:
+    """
+    Trace hook that keeps the most recent spans in memory. Install it with connector.tracer = TraceRecorder().
+    """
+
+    def __init__(self, capacity: int = 100000):
+        self.__spans = deque(maxlen=capacity)
+
+    def __call__(self, stage: str, start_ns: int, end_ns: int):
+        self.__spans.append(TraceSpan(stage, start_ns, end_ns, threading.get_ident()))
+
+    def clear(self):
+        self.__spans.clear()
+
+    @property
+    def spans(self) -> List[TraceSpan]:
+        return list(self.__spans)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        :return: Number of occurrences as well as mean and maximum duration in microseconds of each stage.
+        """
+        durations = {}
+        for span in self.__spans:
+            durations.setdefault(span.stage, []).append((span.end_ns - span.start_ns) / 1000)
+        return {stage: {"count": len(d), "mean_us": sum(d) / len(d), "max_us": max(d)} for stage, d in durations.items()}
+
+    def export_chrome_trace(self, path: str, process_name: Optional[str] = None):
+        export_chrome_trace(self.spans, path, process_name=process_name)
+
+
+def export_chrome_trace(spans: List[TraceSpan], path: str, process_name: Optional[str] = None):
+    """
+    Writes the spans in the Chrome trace event format, which can be opened with https://ui.perfetto.dev or
+    chrome://tracing.
+    :param spans: Spans to export, e.g. TraceRecorder.spans.
+    :param path: Path of the JSON file to write.
+    :param process_name: Name shown for the process in the trace viewer.
+    """
+    pid = os.getpid()
+    events = []
+    if process_name is not None:
+        events.append({"name": "process_name", "ph": "M", "pid": pid, "args": {"name": process_name}})
+    for span in spans:
+        event = {"name": span.stage, "cat": "rhp12rn", "pid": pid, "tid": span.thread_id, "ts": span.start_ns / 1000}
+        if span.end_ns == span.start_ns:
+            event.update(ph="i", s="t")
+        else:
+            event.update(ph="X", dur=(span.end_ns - span.start_ns) / 1000)
+        events.append(event)
+    with open(path, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ns"}, f)
@@ -0,0 +1,169 @@
+"""
+MIT License
+
+Copyright (c) 2021 Tim Schneider
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import struct
+import threading
+import time
+from typing import Iterable, NamedTuple, Optional, Sequence, Union
+
+import numpy as np
+
+from .dynamixel_connector import DynamixelConnector
+
+PlaybackReport = NamedTuple("PlaybackReport", (
+    ("deadlines", np.ndarray), ("send_times", np.ndarray), ("dropped", np.ndarray)))
+PlaybackReport.__doc__ = """
+Timing of a playback relative to its start in seconds. send_times is NaN for samples that were dropped.
+"""
+
+
+def lateness(report: PlaybackReport) -> np.ndarray:
+    """
+    :return: Delay of each sent sample relative to its deadline in seconds.
+    """
+    sent = ~report.dropped
+    return report.send_times[sent] - report.deadlines[sent]
+
+
+class TrajectoryPlayer:
+    """
+    Streams setpoints (e.g. goal positions or goal currents) to the gripper at a fixed rate. The samples are sent on an
+    absolute schedule, hence the timing does not depend on the loop speed of the caller. If the player falls behind, a
+    sample whose successor is already due is dropped instead of being sent late, such that the gripper always receives
+    the most recent setpoint.
+    """
+
+    def __init__(self, connector: DynamixelConnector, spin_time: float = 0.0005):
+        """
+        :param connector: Connected connector of the gripper.
+        :param spin_time: Time in seconds before a deadline after which the player busy-waits instead of sleeping, which
+                          compensates for the wake-up latency of the operating system.
+        """
+        self.__connector = connector
+        self.__spin_time = spin_time
+        self.__running = False
+        self.__thread: Optional[threading.Thread] = None
+        self.__report: Optional[PlaybackReport] = None
+        self.__error: Optional[BaseException] = None
+
+    def __wait_until(self, deadline: float):
+        remaining = deadline - time.perf_counter()
+        if remaining > self.__spin_time:
+            time.sleep(remaining - self.__spin_time)
+        while time.perf_counter() < deadline:
+            pass
+
+    def __encode(self, field_name: str, value) -> int:
+        value = int(value)
+        data_type = self.__connector.fields[field_name].data_type
+        # negative values of unsigned fields (e.g. goal_current) are sent in two's complement
+        if value < 0 and data_type.isupper():
+            value += 1 << (8 * struct.calcsize(data_type))
+        return value
+
+    def play(self, setpoints: Union[np.ndarray, Iterable], rate: float,
+             fields: Sequence[str] = ("goal_position",)) -> PlaybackReport:
+        """
+        Plays the setpoints back and blocks until all of them have been sent.
+        :param setpoints: Array of shape (N,) or (N, len(fields)), or any iterable (e.g. a generator for online streams)
+                          yielding a scalar or a sequence of len(fields) values per sample.
+        :param rate: Rate in Hz at which the samples are sent.
+        :param fields: Fields the values of each sample are written to.
+        :return: Timing of the playback.
+        """
+        self.__running = True
+        return self.__play(setpoints, rate, fields)
+
+    def __play(self, setpoints, rate: float, fields: Sequence[str]) -> PlaybackReport:
+        period = 1.0 / rate
+        deadlines, send_times = [], []
+        start = time.perf_counter()
+        superseded = None
+        for i, sample in enumerate(setpoints):
+            if not self.__running:
+                break
+            deadline = start + i * period
+            deadlines.append(deadline - start)
+            if time.perf_counter() >= deadline + period:
+                # the next sample is already due, so this one is superseded
+                send_times.append(np.nan)
+                superseded = sample
+                continue
+            superseded = None
+            self.__wait_until(deadline)
+            send_times.append(time.perf_counter() - start)
+            self.__send(sample, fields)
+        else:
+            if superseded is not None:
+                # there is no next sample, so the final setpoint is sent late rather than not at all
+                send_times[-1] = time.perf_counter() - start
+                self.__send(superseded, fields)
+        self.__running = False
+        send_times = np.array(send_times)
+        return PlaybackReport(np.array(deadlines), send_times, np.isnan(send_times))
+
+    def __send(self, sample, fields: Sequence[str]):
+        values = [sample] if len(fields) == 1 and np.ndim(sample) == 0 else sample
+        futures = [self.__connector.write_field_async(f, self.__encode(f, v)) for f, v in zip(fields, values)]
+        for future in futures:
+            future.result()
+
+    def __run(self, setpoints, rate: float, fields: Sequence[str]):
+        try:
+            self.__report = self.__play(setpoints, rate, fields)
+        except BaseException as e:
+            self.__error = e
+
+    def start(self, setpoints: Union[np.ndarray, Iterable], rate: float, fields: Sequence[str] = ("goal_position",)):
+        """
+        Plays the setpoints back in a background thread, see play.
+        """
+        self.__report = self.__error = None
+        self.__running = True
+        self.__thread = threading.Thread(target=self.__run, args=(setpoints, rate, fields), daemon=True)
+        self.__thread.start()
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[PlaybackReport]:
+        """
+        Waits for a playback started with start to finish and re-raises any error of the playback.
+        :return: Timing of the playback or None if the timeout passed before.
+        """
+        self.__thread.join(timeout)
+        if self.__thread.is_alive():
+            return None
+        if self.__error is not None:
+            raise self.__error
+        return self.__report
+
+    def stop(self) -> Optional[PlaybackReport]:
+        """
+        Stops the playback after the current sample.
+        """
+        self.__running = False
+        if self.__thread is not None:
+            return self.wait()
+
+    @property
+    def playing(self) -> bool:
+        return self.__running
@@ -0,0 +1,188 @@
+"""
+MIT License
+
+Copyright (c) 2021 Tim Schneider
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+import math
+from typing import Dict, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+
+Values = Union[int, float, np.ndarray]
+
+
+class UnitScales(NamedTuple):
+    # finger travel in mm between the fully open (position 0) and the fully closed gripper
+    stroke_mm: float
+    # position value of the fully closed gripper
+    stroke_ticks: int
+    # physical value of one unit of the respective fields
+    current_ma: float
+    velocity_rpm: float
+    pwm_percent: Optional[float]
+    voltage_v: float = 0.1
+
+
+# Scale factors according to the ROBOTIS e-Manual of the respective model
+RHP12RN_SCALES = UnitScales(stroke_mm=106.0, stroke_ticks=1150, current_ma=4.02, velocity_rpm=0.114, pwm_percent=None)
+RHP12RNA_SCALES = UnitScales(stroke_mm=106.0, stroke_ticks=1150, current_ma=1.0, velocity_rpm=0.114,
+                             pwm_percent=100 / 2009)
+SCALES_BY_MODEL_NUMBER = {35073: RHP12RN_SCALES, 35074: RHP12RNA_SCALES}
+
+
+def _round(values: Values) -> Values:
+    rounded = np.rint(values).astype(np.int64)
+    return int(rounded) if rounded.ndim == 0 else rounded
+
+
+def _from_value(values: Values) -> Values:
+    return float(values) if np.ndim(values) == 0 else values
+
+
+def to_signed16(values: Values) -> Values:
+    """
+    Interprets values of 16 bit fields read as unsigned (e.g. present_current) as two's complement.
+    """
+    values = np.asarray(values, dtype=np.int64)
+    signed = np.where(values > 0x7fff, values - 0x10000, values)
+    return int(signed) if signed.ndim == 0 else signed
+
+
+def to_unsigned16(values: Values) -> Values:
+    """
+    Encodes negative values as two's complement for writing to 16 bit fields (e.g. goal_current).
+    """
+    values = np.asarray(values, dtype=np.int64)
+    unsigned = np.where(values < 0, values + 0x10000, values)
+    return int(unsigned) if unsigned.ndim == 0 else unsigned
+
+
+class Units:
+    """
+    Converts between raw control table values and physical units. All conversions accept scalars as well as numpy
+    arrays (e.g. recorded telemetry or trajectories) and are computed in a single vectorized operation. The position
+    and velocity limits used by the relative conversions are cached, such that converting never touches the bus.
+    """
+
+    def __init__(self, scales: UnitScales, position_limits: Tuple[int, int] = (0, 1150),
+                 velocity_limit: Optional[int] = None):
+        """
+        :param scales: Scale factors of the gripper model.
+        :param position_limits: Minimum and maximum position limit, which correspond to the relative positions 0 and 1.
+        :param velocity_limit: Velocity limit, which corresponds to the relative velocities -1 and 1.
+        """
+        self.__scales = scales
+        self.__position_limits = position_limits
+        self.__velocity_limit = velocity_limit
+        self.__mm_per_tick = scales.stroke_mm / scales.stroke_ticks
+        self.__rad_s_per_unit = scales.velocity_rpm * 2 * math.pi / 60
+
+    @classmethod
+    def for_connector(cls, connector) -> "Units":
+        """
+        Reads the model number and the limits of the connected gripper once.
+        """
+        values = connector.read_fields(["model_number", "min_position_limit", "max_position_limit", "velocity_limit"])
+        if values["model_number"] not in SCALES_BY_MODEL_NUMBER:
+            raise ValueError("Unknown model number {}.".format(values["model_number"]))
+        return cls(SCALES_BY_MODEL_NUMBER[values["model_number"]],
+                   (values["min_position_limit"], values["max_position_limit"]), values["velocity_limit"])
+
+    def position_to_mm(self, position: Values) -> Values:
+        """
+        :return: Finger travel in mm from the fully open gripper.
+        """
+        return _from_value(np.multiply(position, self.__mm_per_tick))
+
+    def mm_to_position(self, travel_mm: Values) -> Values:
+        return _round(np.divide(travel_mm, self.__mm_per_tick))
+
+    def position_to_rel(self, position: Values) -> Values:
+        low, high = self.__position_limits
+        return _from_value(np.divide(np.subtract(position, low), high - low))
+
+    def rel_to_position(self, rel: Values) -> Values:
+        low, high = self.__position_limits
+        return _round(np.multiply(rel, high - low) + low)
+
+    def velocity_to_rad_s(self, velocity: Values) -> Values:
+        return _from_value(np.multiply(velocity, self.__rad_s_per_unit))
+
+    def rad_s_to_velocity(self, rad_s: Values) -> Values:
+        return _round(np.divide(rad_s, self.__rad_s_per_unit))
+
+    def velocity_to_rel(self, velocity: Values) -> Values:
+        if self.__velocity_limit is None:
+            raise ValueError("The velocity limit is unknown.")
+        return _from_value(np.divide(velocity, self.__velocity_limit))
+
+    def rel_to_velocity(self, rel: Values) -> Values:
+        if self.__velocity_limit is None:
+            raise ValueError("The velocity limit is unknown.")
+        return _round(np.multiply(rel, self.__velocity_limit))
+
+    def current_to_ma(self, current: Values) -> Values:
+        """
+        :param current: Raw current as read from the unsigned present_current or goal_current field.
+        """
+        return _from_value(np.multiply(to_signed16(current), self.__scales.current_ma))
+
+    def ma_to_current(self, current_ma: Values) -> Values:
+        """
+        :return: Raw current encoded for writing to the unsigned goal_current field.
+        """
+        return to_unsigned16(_round(np.divide(current_ma, self.__scales.current_ma)))
+
+    def pwm_to_percent(self, pwm: Values) -> Values:
+        if self.__scales.pwm_percent is None:
+            raise ValueError("The gripper model does not provide a PWM value.")
+        return _from_value(np.multiply(to_signed16(pwm), self.__scales.pwm_percent))
+
+    def voltage_to_v(self, voltage: Values) -> Values:
+        return _from_value(np.multiply(voltage, self.__scales.voltage_v))
+
+    def convert_status(self, status: Dict[str, Values]) -> Dict[str, Values]:
+        """
+        Converts the fields of a status (or of a batch of recorded statuses, with one array per field) that have a
+        physical unit: positions to mm of finger travel, velocities to rad/s, currents to mA, PWM to % and the input
+        voltage to V. Other fields are passed through.
+        """
+        conversions = {
+            "present_position": self.position_to_mm, "goal_position": self.position_to_mm,
+            "position_trajectory": self.position_to_mm, "present_velocity": self.velocity_to_rad_s,
+            "goal_velocity": self.velocity_to_rad_s, "velocity_trajectory": self.velocity_to_rad_s,
+            "present_current": self.current_to_ma, "goal_current": self.current_to_ma,
+            "present_pwm": self.pwm_to_percent, "present_input_voltage": self.voltage_to_v
+        }
+        return {name: conversions[name](value) if name in conversions else value for name, value in status.items()}
+
+    @property
+    def scales(self) -> UnitScales:
+        return self.__scales
+
+    @property
+    def position_limits(self) -> Tuple[int, int]:
+        return self.__position_limits
+
+    @property
+    def velocity_limit(self) -> Optional[int]:
+        return self.__velocity_limit
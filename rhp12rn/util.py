@@ -22,17 +22,40 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 
-from typing import Sequence, Tuple, List
+import json
+import os
+import statistics
+import time
+from typing import Sequence, Tuple, List, Optional, Dict, NamedTuple, Type
 
-from .dynamixel_connector import DynamixelConnector, Field, DynamixelConnectionError, DynamixelCommunicationError
+from dynamixel_sdk import PortHandler
 
+from .dynamixel_connector import DynamixelConnector, Field, DynamixelConnectionError, DynamixelCommunicationError, \
+    DynamixelError, MAX_BLOCK_READ_LENGTH
+from .rhp12rn_connector import RHP12RNConnector
+from .rhp12rna_connector import RHP12RNAConnector
 
-def find_grippers(device: str = "/dev/ttyUSB0",
-                  baud_rates: Sequence[int] = (9600, 57600, 115200, 1000000, 2000000, 3000000, 4000000, 4500000)) \
-        -> List[Tuple[str, int, int]]:
+# Values of the baud_rate field of the control table (identical for the RH-P12-RN and the RH-P12-RN(A))
+BAUD_RATE_FIELD_VALUES = {
+    9600: 0, 57600: 1, 115200: 2, 1000000: 3, 2000000: 4, 3000000: 5, 4000000: 6, 4500000: 7
+}
+
+SERIAL_BY_ID_DIR = "/dev/serial/by-id"
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "rhp12rn")
+VERIFIED_BAUD_RATES_FILE = os.path.join(CACHE_DIR, "baud_rates.json")
+DISCOVERY_CACHE_FILE = os.path.join(CACHE_DIR, "grippers.json")
+
+DEFAULT_BAUD_RATES = (9600, 57600, 115200, 1000000, 2000000, 3000000, 4000000, 4500000)
+MODEL_NAMES = {35073: "RH-P12-RN", 35074: "RH-P12-RN(A)"}
+_CONNECTOR_TYPES = {"RH-P12-RN": RHP12RNConnector, "RH-P12-RN(A)": RHP12RNAConnector}
+
+
+def find_grippers(device: str = "/dev/ttyUSB0", baud_rates: Sequence[int] = DEFAULT_BAUD_RATES,
+                  stop_at_first: bool = False) -> List[Tuple[str, int, int]]:
     """
     Sweeps the specified baud rates and all possible dynamixel ids to find connected RH-P12-RN[(A)] grippers.
     :param baud_rates: Baud rates to test
+    :param stop_at_first: Whether to end the sweep as soon as a gripper has been found.
     :return: List of tuples containing the model name, baud rate and Dynamixel id of each identified gripper.
     """
     found_devices = []
@@ -44,10 +67,231 @@ def find_grippers(device: str = "/dev/ttyUSB0",
                         device=device, fields=[Field(0, "H", "model_number", "Model Number", False, 0)], baud_rate=r,
                         dynamixel_id=i) as connector:
                     model_number = connector.read_field("model_number")
-                    if model_number in [35073, 35074]:
-                        model_name = "RH-P12-RN" if model_number == 35073 else "RH-P12-RN(A)"
+                    if model_number in MODEL_NAMES:
+                        model_name = MODEL_NAMES[model_number]
                         found_devices.append((model_name, r, i))
                         print("Found {} with ID {} at baud rate {}".format(model_name, i, r))
+                        if stop_at_first:
+                            return found_devices
             except DynamixelCommunicationError:
                 pass
-    return found_devices
\ No newline at end of file
+    return found_devices
+
+
+def adapter_key(device: str) -> str:
+    """
+    Returns a key identifying the USB serial adapter behind the given device. If available, the /dev/serial/by-id path
+    of the adapter is used, which contains its serial number and hence stays valid if the adapter is enumerated under a
+    different /dev/ttyUSB* name. Otherwise, the resolved device path is returned.
+    :param device: Device path of the adapter, e.g. /dev/ttyUSB0.
+    :return: Key of the adapter.
+    """
+    real_path = os.path.realpath(device)
+    if os.path.isdir(SERIAL_BY_ID_DIR):
+        for entry in sorted(os.listdir(SERIAL_BY_ID_DIR)):
+            path = os.path.join(SERIAL_BY_ID_DIR, entry)
+            if os.path.realpath(path) == real_path:
+                return path
+    return real_path
+
+
+def _load_json(path: str) -> Dict:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _store_json(path: str, content: Dict):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = "{}.tmp".format(path)
+    with open(tmp_path, "w") as f:
+        json.dump(content, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def verified_baud_rate(device: str, record_file: str = VERIFIED_BAUD_RATES_FILE) -> Optional[int]:
+    """
+    Returns the highest baud rate verified by negotiate_baud_rate for the adapter behind the given device.
+    :param device: Device path of the adapter.
+    :param record_file: File the verified baud rates are stored in.
+    :return: Highest verified baud rate or None if no baud rate has been verified for this adapter yet.
+    """
+    return _load_json(record_file).get(adapter_key(device))
+
+
+def _soak_test(connector: DynamixelConnector, reads: int) -> float:
+    packet_handler = connector.packet_handler
+    packet_handler.reset_counters()
+    for _ in range(reads):
+        try:
+            connector.read_field("present_position")
+        except DynamixelCommunicationError:
+            pass
+    errors = packet_handler.timeouts + packet_handler.corrupt_packets
+    return errors / max(1, errors + packet_handler.packets_received)
+
+
+def _responds(connector: DynamixelConnector) -> bool:
+    try:
+        connector.read_field("model_number")
+        return True
+    except DynamixelCommunicationError:
+        return False
+
+
+def _fall_back(connector: DynamixelConnector, baud_rate: int, attempts: int = 3):
+    # If the link is marginal, the instruction to change the baud rate might get lost, so we retry a few times and check
+    # at which baud rate the gripper actually responds
+    failed_baud_rate = connector.baud_rate
+    for _ in range(attempts):
+        connector.set_baud_rate(baud_rate)
+        if _responds(connector):
+            return
+        connector.set_baud_rate(failed_baud_rate, update_gripper=False)
+    raise DynamixelConnectionError(
+        "Failed to fall back from baud rate {} to {}.".format(failed_baud_rate, baud_rate))
+
+
+def negotiate_baud_rate(connector: DynamixelConnector,
+                        baud_rates: Sequence[int] = (4500000, 4000000, 3000000, 2000000, 1000000),
+                        soak_reads: int = 200, max_error_rate: float = 0.005,
+                        record_file: Optional[str] = VERIFIED_BAUD_RATES_FILE) -> int:
+    """
+    Moves a connected gripper to the highest of the given baud rates at which the link is reliable. Starting from the
+    highest candidate above the current baud rate, the baud rate is written to the EEPROM of the gripper, the port is
+    reopened at the new rate and an error-rate soak test is run. If the error rate exceeds max_error_rate, the gripper
+    is moved back to its original baud rate and the next lower candidate is tried. Torque has to be disabled.
+    :param connector: Connected connector of the gripper.
+    :param baud_rates: Candidate baud rates. Baud rates not supported by the port handler are skipped.
+    :param soak_reads: Number of reads performed in the soak test of each candidate.
+    :param max_error_rate: Maximum fraction of failed packets for a baud rate to be accepted.
+    :param record_file: File to record the highest verified baud rate of the adapter in or None to skip recording.
+    :return: Baud rate the gripper is left at.
+    """
+    if connector.read_field("torque_enable"):
+        raise DynamixelError("Torque has to be disabled to change the baud rate.")
+    start_baud_rate = connector.baud_rate
+    for baud_rate in sorted(set(baud_rates), reverse=True):
+        if baud_rate <= start_baud_rate:
+            break
+        if baud_rate not in BAUD_RATE_FIELD_VALUES or not connector.supports_baud_rate(baud_rate):
+            continue
+        print("Testing baud rate {}...".format(baud_rate))
+        connector.set_baud_rate(baud_rate)
+        error_rate = _soak_test(connector, soak_reads)
+        if error_rate <= max_error_rate:
+            print("Verified baud rate {} (error rate {:.2%}).".format(baud_rate, error_rate))
+            if record_file is not None:
+                records = _load_json(record_file)
+                records[adapter_key(connector.device)] = baud_rate
+                _store_json(record_file, records)
+            return baud_rate
+        print("Link at baud rate {} is marginal (error rate {:.2%}), falling back...".format(baud_rate, error_rate))
+        _fall_back(connector, start_baud_rate)
+    return start_baud_rate
+
+
+class DiscoveredGripper(NamedTuple):
+    model_name: str
+    baud_rate: int
+    dynamixel_id: int
+    # median and maximum round trip time of a single field read, measured when the gripper was discovered
+    round_trip_ms: Optional[float] = None
+    max_round_trip_ms: Optional[float] = None
+
+    @property
+    def packet_timeout_ms(self) -> float:
+        """
+        Packet timeout that covers the largest block read at the baud rate of the gripper plus a margin over the
+        measured round trip time. Never exceeds the default timeout of the connector (100ms).
+        """
+        if self.max_round_trip_ms is None:
+            return 100.0
+        transfer_ms = (MAX_BLOCK_READ_LENGTH + 11) * 10 / self.baud_rate * 1000
+        return min(100.0, 4 * self.max_round_trip_ms + transfer_ms)
+
+
+def cached_gripper(device: str, cache_file: str = DISCOVERY_CACHE_FILE) -> Optional[DiscoveredGripper]:
+    """
+    Returns the gripper last discovered on the adapter behind the given device.
+    :param device: Device path of the adapter.
+    :param cache_file: File the discovered grippers are stored in.
+    :return: The cached gripper or None if no gripper has been discovered on this adapter yet.
+    """
+    record = _load_json(cache_file).get(adapter_key(device))
+    if record is None:
+        return None
+    try:
+        return DiscoveredGripper(**record)
+    except TypeError:
+        return None
+
+
+def _measure_round_trip(connector: DynamixelConnector, reads: int) -> Tuple[float, float]:
+    round_trips = []
+    for _ in range(reads):
+        start = time.perf_counter()
+        connector.read_field("model_number")
+        round_trips.append((time.perf_counter() - start) * 1000)
+    return statistics.median(round_trips), max(round_trips)
+
+
+def discover_gripper(device: str = "/dev/ttyUSB0", baud_rates: Sequence[int] = DEFAULT_BAUD_RATES,
+                     cache_file: Optional[str] = DISCOVERY_CACHE_FILE,
+                     port_handler_type: Type[PortHandler] = PortHandler, calibration_reads: int = 20) \
+        -> DynamixelConnector:
+    """
+    Connects to the gripper on the given adapter without knowing its baud rate and Dynamixel ID. The gripper last
+    discovered on the adapter is tried first, which takes a single round trip. Only if it does not respond, the baud
+    rates are swept (starting with the cached and the verified baud rate of the adapter) and the found gripper, together
+    with its measured round trip time, is stored in the cache.
+    :param device: Device path of the adapter.
+    :param baud_rates: Baud rates to sweep if the cached gripper does not respond.
+    :param cache_file: File the discovered grippers are stored in or None to always sweep.
+    :param port_handler_type: Port handler class of the returned connector.
+    :param calibration_reads: Number of reads used to measure the round trip time of a newly discovered gripper.
+    :return: Connected connector of the matching model, with its packet timeout set from the measured round trip time.
+    """
+    cached = cached_gripper(device, cache_file) if cache_file is not None else None
+    if cached is not None and cached.model_name in _CONNECTOR_TYPES:
+        connector = _CONNECTOR_TYPES[cached.model_name](
+            device=device, baud_rate=cached.baud_rate, dynamixel_id=cached.dynamixel_id,
+            port_handler_type=port_handler_type)
+        connector.packet_timeout_ms = cached.packet_timeout_ms
+        try:
+            connector.connect()
+            # reading the model number verifies the cached baud rate and ID, and that the gripper has not been replaced
+            # by a different model that happens to use the same baud rate and ID
+            model_name = MODEL_NAMES.get(connector.read_field("model_number"))
+            if model_name == cached.model_name:
+                return connector
+            connector.disconnect()
+            print("Found a {} instead of the cached {} at baud rate {} and ID {}, sweeping...".format(
+                model_name, cached.model_name, cached.baud_rate, cached.dynamixel_id))
+        except (DynamixelCommunicationError, DynamixelConnectionError):
+            connector.disconnect()
+            print("Gripper is not responding at the cached baud rate {} and ID {}, sweeping...".format(
+                cached.baud_rate, cached.dynamixel_id))
+
+    preferred = [cached.baud_rate if cached is not None else None, verified_baud_rate(device)]
+    ordered_baud_rates = [r for r in preferred if r in baud_rates] + [r for r in baud_rates if r not in preferred]
+    found = find_grippers(device, ordered_baud_rates, stop_at_first=True)
+    if len(found) == 0:
+        raise DynamixelConnectionError("No gripper found on {}.".format(device))
+    model_name, baud_rate, dynamixel_id = found[0]
+    connector = _CONNECTOR_TYPES[model_name](
+        device=device, baud_rate=baud_rate, dynamixel_id=dynamixel_id, port_handler_type=port_handler_type)
+    connector.connect()
+    try:
+        round_trip_ms, max_round_trip_ms = _measure_round_trip(connector, calibration_reads)
+    except DynamixelCommunicationError:
+        round_trip_ms = max_round_trip_ms = None
+    discovered = DiscoveredGripper(model_name, baud_rate, dynamixel_id, round_trip_ms, max_round_trip_ms)
+    connector.packet_timeout_ms = discovered.packet_timeout_ms
+    if cache_file is not None:
+        records = _load_json(cache_file)
+        records[adapter_key(device)] = discovered._asdict()
+        _store_json(cache_file, records)
+    return connector
@@ -0,0 +1,57 @@
+"""
+Compares the bus and CPU load of polling the status of an idle gripper at a fixed rate with the AdaptivePoller. The
+gripper is emulated on a pty pair and the results are extrapolated to an idle hour.
+"""
+
+import argparse
+import threading
+import time
+
+from dynamixel_sdk import PortHandler
+
+from pty_gripper import PtyGripper
+from rhp12rn import DynamixelConnector, RHP12RNA_FIELDS, SelectPortHandler, AdaptivePoller
+from rhp12rn.poller import DEFAULT_STATUS_FIELDS
+
+
+def fixed_rate(connector: DynamixelConnector, rate: float, duration: float):
+    period = 1.0 / rate
+    end = time.monotonic() + duration
+    next_step = time.monotonic()
+    while next_step < end:
+        connector.read_fields(DEFAULT_STATUS_FIELDS)
+        next_step += period
+        time.sleep(max(0.0, next_step - time.monotonic()))
+
+
+def adaptive(connector: DynamixelConnector, rate: float, duration: float):
+    poller = AdaptivePoller(connector, active_rate=rate)
+    timer = threading.Timer(duration, poller.stop)
+    timer.start()
+    poller.run()
+
+
+def benchmark(name, poll, port_handler_type, rate: float, duration: float, reply_delay: float):
+    with PtyGripper(RHP12RNA_FIELDS, reply_delay=reply_delay) as gripper:
+        with DynamixelConnector(RHP12RNA_FIELDS, device=gripper.device, baud_rate=1000000,
+                                port_handler_type=port_handler_type) as connector:
+            instructions = gripper.instructions_received
+            start_cpu = time.thread_time()
+            poll(connector, rate, duration)
+            cpu = time.thread_time() - start_cpu
+            instructions = gripper.instructions_received - instructions
+    scale = 3600 / duration
+    print("{:<12} {:>12.0f} instructions/h {:>10.1f}s CPU/h ({:.1%} CPU load)".format(
+        name, instructions * scale, cpu * scale, cpu / duration))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-t", "--duration", type=float, default=30.0, help="Measured idle time in s.")
+    parser.add_argument("-r", "--rate", type=float, default=500.0, help="Fixed and active polling rate in Hz.")
+    parser.add_argument("-d", "--reply-delay", type=float, default=0.001, help="Reply delay of the gripper in s.")
+    parser.add_argument("--select", action="store_true", help="Use the SelectPortHandler.")
+    args = parser.parse_args()
+    port_handler_type = SelectPortHandler if args.select else PortHandler
+    benchmark("fixed rate", fixed_rate, port_handler_type, args.rate, args.duration, args.reply_delay)
+    benchmark("adaptive", adaptive, port_handler_type, args.rate, args.duration, args.reply_delay)
@@ -0,0 +1,58 @@
+"""
+Measures the time it takes to import the package in a fresh interpreter and fails if it exceeds a threshold or if heavy
+dependencies are imported eagerly. Run from the repository root or with the package installed.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+_PROBE = """
+import sys, time
+start = time.perf_counter()
+import rhp12rn
+import_time = time.perf_counter() - start
+start = time.perf_counter()
+rhp12rn.{}
+access_time = time.perf_counter() - start
+eager = [m for m in ("dynamixel_sdk", "numpy", "rhp12rn.rhp12rn_connector", "rhp12rn.rhp12rna_connector")
+         if m in sys.modules]
+print(import_time, access_time, ",".join(eager))
+"""
+
+
+def measure(attribute: str, runs: int):
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join([os.path.join(os.path.dirname(__file__), ".."), env.get("PYTHONPATH", "")])
+    import_times, access_times = [], []
+    eager = ""
+    for _ in range(runs):
+        output = subprocess.check_output([sys.executable, "-c", _PROBE.format(attribute)], env=env).decode().split()
+        import_times.append(float(output[0]))
+        access_times.append(float(output[1]))
+        eager = output[2] if len(output) > 2 else ""
+    return statistics.median(import_times), statistics.median(access_times), eager
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--runs", type=int, default=10)
+    parser.add_argument("--max-import-ms", type=float, default=20.0,
+                        help="Maximum accepted median time of a bare 'import rhp12rn'.")
+    args = parser.parse_args()
+
+    failed = False
+    for attribute in ["__name__", "RHP12RNAConnector", "RHP12RNAConnector(); rhp12rn.RHP12RNA_FIELDS"]:
+        import_time, access_time, eager = measure(attribute, args.runs)
+        print("rhp12rn.{:<50} import {:>7.2f}ms  access {:>7.2f}ms".format(
+            attribute, import_time * 1e3, access_time * 1e3))
+        if attribute == "__name__":
+            if import_time * 1e3 > args.max_import_ms:
+                print("FAIL: importing the package took longer than {}ms".format(args.max_import_ms))
+                failed = True
+            if eager != "":
+                print("FAIL: importing the package imported {} eagerly".format(eager))
+                failed = True
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,36 @@
+"""
+Compares the CPU time the polling PortHandler and the event-driven SelectPortHandler spend per read transaction. The
+gripper is emulated on a pty pair with a configurable reply delay, which mimics the latency of the USB serial driver.
+"""
+
+import argparse
+import time
+
+from dynamixel_sdk import PortHandler
+
+from pty_gripper import PtyGripper
+from rhp12rn import DynamixelConnector, RHP12RNA_FIELDS, SelectPortHandler
+
+
+def benchmark(port_handler_type, transactions: int, reply_delay: float):
+    with PtyGripper(RHP12RNA_FIELDS, reply_delay=reply_delay) as gripper:
+        with DynamixelConnector(RHP12RNA_FIELDS, device=gripper.device, baud_rate=1000000,
+                                port_handler_type=port_handler_type) as connector:
+            connector.read_field("model_number")
+            start_wall = time.perf_counter()
+            start_cpu = time.thread_time()
+            for _ in range(transactions):
+                connector.read_field("present_position")
+            cpu = time.thread_time() - start_cpu
+            wall = time.perf_counter() - start_wall
+    print("{:<20} {:>10.1f}us wall {:>10.1f}us CPU {:>6.1%} CPU load".format(
+        port_handler_type.__name__, wall / transactions * 1e6, cpu / transactions * 1e6, cpu / wall))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--transactions", type=int, default=500)
+    parser.add_argument("-d", "--reply-delay", type=float, default=0.001, help="Reply delay of the gripper in s.")
+    args = parser.parse_args()
+    for t in [PortHandler, SelectPortHandler]:
+        benchmark(t, args.transactions, args.reply_delay)
@@ -0,0 +1,36 @@
+"""
+Counts the read system calls per received status packet, both for strictly alternating transactions and for pipelined
+reads (several instructions sent before the first reply is read), on an emulated gripper.
+"""
+
+import argparse
+import time
+
+from pty_gripper import PtyGripper
+from rhp12rn import DynamixelConnector, RHP12RNA_FIELDS, SelectPortHandler
+
+
+def benchmark(connector: DynamixelConnector, transactions: int, depth: int):
+    handler = connector.packet_handler
+    handler.reset_counters()
+    start = time.perf_counter()
+    for _ in range(transactions // depth):
+        futures = [connector.read_field_async("present_position") for _ in range(depth)]
+        # let the replies of all instructions arrive before reading the first one
+        time.sleep(0.001)
+        for future in futures:
+            future.result()
+    duration = time.perf_counter() - start
+    print("pipeline depth {:>3}: {:>6.2f} reads/packet {:>8.1f}us/transaction".format(
+        depth, handler.rx_reads / handler.packets_received, duration / handler.packets_received * 1e6))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--transactions", type=int, default=1000)
+    args = parser.parse_args()
+    with PtyGripper(RHP12RNA_FIELDS) as gripper:
+        with DynamixelConnector(RHP12RNA_FIELDS, device=gripper.device, baud_rate=1000000,
+                                port_handler_type=SelectPortHandler) as connector:
+            for depth in [1, 4, 16]:
+                benchmark(connector, args.transactions, depth)
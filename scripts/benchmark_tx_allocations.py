@@ -0,0 +1,62 @@
+"""
+Measures the memory allocated per transmitted instruction packet by the transmit path of the dynamixel_sdk (readTx,
+writeTxOnly) and by the preallocated templates of the CustomProtocol2PacketHandler (read_tx, write_tx). The packets are
+written to a pty, whose other end is drained between the measurements.
+"""
+
+import argparse
+import os
+import struct
+import time
+import tracemalloc
+import tty
+
+from dynamixel_sdk import PortHandler, INST_READ, INST_WRITE
+
+from rhp12rn.custom_protocol2_packet_handler import CustomProtocol2PacketHandler
+
+
+def measure(name: str, transmit, port: PortHandler, master_fd: int, packets: int):
+    for _ in range(100):
+        transmit()
+        port.is_using = False
+    os.read(master_fd, 65536)
+    allocated = 0
+    duration = 0.0
+    tracemalloc.start()
+    for _ in range(packets):
+        current = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        start = time.perf_counter()
+        transmit()
+        duration += time.perf_counter() - start
+        allocated += tracemalloc.get_traced_memory()[1] - current
+        port.is_using = False
+        os.read(master_fd, 65536)
+    tracemalloc.stop()
+    print("{:<32} {:>8.1f} bytes peak allocation/packet {:>8.1f}us/packet".format(
+        name, allocated / packets, duration / packets * 1e6))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", "--packets", type=int, default=2000)
+    args = parser.parse_args()
+
+    master_fd, slave_fd = os.openpty()
+    tty.setraw(slave_fd)
+    port = PortHandler(os.ttyname(slave_fd))
+    port.openPort()
+    port.setBaudRate(1000000)
+    handler = CustomProtocol2PacketHandler()
+    read_template = handler.tx_template(INST_READ, 1, 580, 4)
+    write_template = handler.tx_template(INST_WRITE, 1, 564, 4, "i")
+    value = 1000
+
+    measure("sdk readTx", lambda: handler.readTx(port, 1, 580, 4), port, master_fd, args.packets)
+    measure("template read_tx", lambda: handler.read_tx(port, read_template), port, master_fd, args.packets)
+    measure("sdk writeTxOnly", lambda: handler.writeTxOnly(port, 1, 564, 4, list(struct.pack("<i", value))),
+            port, master_fd, args.packets)
+    measure("template write_tx", lambda: handler.write_tx(port, write_template, value), port, master_fd, args.packets)
+    port.closePort()
+    os.close(master_fd)
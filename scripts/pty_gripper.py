@@ -0,0 +1,122 @@
+"""
+Emulates a Dynamixel Protocol 2.0 device on a Linux pty pair, such that the connector can be exercised without hardware.
+"""
+
+import os
+import struct
+import threading
+import time
+import tty
+from typing import Sequence
+
+from dynamixel_sdk import Protocol2PacketHandler, INST_PING, INST_READ, INST_WRITE, INST_REG_WRITE, INST_ACTION, \
+    INST_SYNC_READ, BROADCAST_ID
+
+from rhp12rn.dynamixel_connector import Field
+
+
+class PtyGripper:
+    def __init__(self, fields: Sequence[Field] = (), dynamixel_id: int = 1, reply_delay: float = 0.0,
+                 model_number: int = 35074):
+        self.__dynamixel_id = dynamixel_id
+        self.__reply_delay = reply_delay
+        self.__model_number = model_number
+        self.__packet_handler = Protocol2PacketHandler()
+        self.control_table = bytearray(1024)
+        for f in fields:
+            if f.initial_value is not None:
+                struct.pack_into("<" + f.data_type, self.control_table, f.address, f.initial_value)
+        self.__registered = None
+        self.instructions_received = 0
+        # the indirect data area mirrors the bytes at the addresses in the indirect address fields
+        field_dict = {f.name: f for f in fields}
+        self.__indirect = None
+        if "indirect_address_1" in field_dict and "indirect_data_1" in field_dict:
+            count = sum(f.name.startswith("indirect_data_") for f in fields)
+            self.__indirect = (field_dict["indirect_address_1"].address, field_dict["indirect_data_1"].address, count)
+        self.__master_fd, slave_fd = os.openpty()
+        tty.setraw(slave_fd)
+        self.device = os.ttyname(slave_fd)
+        self.__slave_fd = slave_fd
+        self.__running = True
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+        self.__thread.start()
+
+    def close(self):
+        self.__running = False
+        os.close(self.__slave_fd)
+        os.close(self.__master_fd)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __reply(self, error: int = 0, params: bytes = b""):
+        packet = [0xFF, 0xFF, 0xFD, 0x00, self.__dynamixel_id, 0, 0, 0x55, error] + list(params) + [0, 0]
+        length = len(params) + 4
+        packet[5], packet[6] = length & 0xFF, length >> 8
+        self.__packet_handler.addStuffing(packet)
+        crc = self.__packet_handler.updateCRC(0, packet, len(packet) - 2)
+        packet[-2], packet[-1] = crc & 0xFF, crc >> 8
+        if self.__reply_delay > 0:
+            time.sleep(self.__reply_delay)
+        os.write(self.__master_fd, bytes(packet))
+
+    def __map(self, address: int) -> int:
+        if self.__indirect is not None:
+            address_start, data_start, count = self.__indirect
+            if data_start <= address < data_start + count:
+                address, = struct.unpack_from("<H", self.control_table, address_start + 2 * (address - data_start))
+        return address
+
+    def __handle(self, dxl_id: int, instruction: int, params: bytes):
+        self.instructions_received += 1
+        status_return_level = self.control_table[516]
+        if instruction == INST_PING:
+            self.__reply(params=struct.pack("<HB", self.__model_number, 0))
+        elif instruction == INST_READ:
+            address, length = struct.unpack_from("<HH", params)
+            self.__reply(params=bytes(self.control_table[self.__map(a)] for a in range(address, address + length)))
+        elif instruction == INST_SYNC_READ and self.__dynamixel_id in params[4:]:
+            address, length = struct.unpack_from("<HH", params)
+            self.__reply(params=bytes(self.control_table[address:address + length]))
+        elif instruction in (INST_WRITE, INST_REG_WRITE):
+            address, = struct.unpack_from("<H", params)
+            if instruction == INST_WRITE:
+                self.control_table[address:address + len(params) - 2] = params[2:]
+            else:
+                self.__registered = (address, params[2:])
+                self.control_table[517] = 1
+            if dxl_id != BROADCAST_ID and status_return_level >= 2:
+                self.__reply()
+        elif instruction == INST_ACTION and self.__registered is not None:
+            address, data = self.__registered
+            self.control_table[address:address + len(data)] = data
+            self.__registered = None
+            self.control_table[517] = 0
+            if dxl_id != BROADCAST_ID and status_return_level >= 2:
+                self.__reply()
+
+    def __run(self):
+        buffer = bytearray()
+        while self.__running:
+            try:
+                buffer += os.read(self.__master_fd, 4096)
+            except OSError:
+                return
+            while True:
+                start = buffer.find(b"\xff\xff\xfd\x00")
+                if start < 0 or len(buffer) < start + 7:
+                    break
+                del buffer[:start]
+                length = buffer[5] | (buffer[6] << 8)
+                if len(buffer) < 7 + length:
+                    break
+                packet = list(buffer[:7 + length])
+                del buffer[:7 + length]
+                packet = self.__packet_handler.removeStuffing(packet)
+                length = packet[5] | (packet[6] << 8)
+                if packet[4] in (self.__dynamixel_id, BROADCAST_ID):
+                    self.__handle(packet[4], packet[7], bytes(packet[8:7 + length - 2]))
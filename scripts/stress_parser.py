@@ -0,0 +1,224 @@
+"""
+Stress test of the status packet parsers. Generates a stream of valid protocol 2.0 status packets (including byte
+stuffing edge cases), injects corruptions (bit flips, truncated packets, corrupted length fields, spurious headers and
+noise) and feeds the stream at line rate to the parser of the dynamixel_sdk and to the CustomProtocol2PacketHandler.
+Reports the parser throughput, the number of intact packets that were lost or corrupted packets that were accepted, the
+resynchronisation bytes dropped, the recovery time from the arrival of a corruption to the delivery of the next intact
+packet (and the intact packets lost in between) and the worst case time from the arrival of an intact packet to its
+delivery.
+
+The stream is replayed on a virtual clock, such that the parsers run at full speed while seeing the arrival pattern of
+a real adapter, which delivers the received bytes at the end of each latency period.
+"""
+
+import argparse
+import math
+import random
+import struct
+import time
+from typing import List, NamedTuple, Optional
+
+from dynamixel_sdk import Protocol2PacketHandler, COMM_SUCCESS, COMM_RX_TIMEOUT, DXL_LOBYTE, DXL_HIBYTE, \
+    RXPACKET_MAX_LEN
+
+from rhp12rn.custom_protocol2_packet_handler import CustomProtocol2PacketHandler
+
+PAYLOADS = ["random", "header", "trailing_header", "stuffed_header", "all_ff"]
+CORRUPTIONS = ["bit_flip", "truncation", "length", "spurious_header", "noise"]
+# corruptions that are inserted in front of a packet and leave the packet itself intact
+INSERTIONS = ["spurious_header", "noise"]
+
+
+class StreamPacket(NamedTuple):
+    sequence: int
+    packet: List[int]  # the packet after removing the byte stuffing, as returned by rxPacket
+    end: int  # offset of the end of the packet in the stream
+    corruption_end: int  # offset of the end of the corrupted bytes in the stream (end if there is no corruption)
+    intact: bool
+    corruption: Optional[str]  # corruption affecting this packet or inserted in front of it
+
+
+def status_packet(packet_handler: Protocol2PacketHandler, dxl_id: int, params: List[int]) -> List[int]:
+    packet = [0xFF, 0xFF, 0xFD, 0x00, dxl_id, DXL_LOBYTE(len(params) + 4), DXL_HIBYTE(len(params) + 4), 0x55, 0x00] + \
+        params + [0, 0]
+    packet = packet_handler.addStuffing(packet)
+    crc = packet_handler.updateCRC(0, packet, len(packet) - 2)
+    packet[-2] = DXL_LOBYTE(crc)
+    packet[-1] = DXL_HIBYTE(crc)
+    return packet
+
+
+def payload(rng: random.Random, sequence: int) -> List[int]:
+    data = [rng.randrange(256) for _ in range(rng.randrange(0, 28))]
+    kind = rng.choice(PAYLOADS)
+    if kind == "header":
+        position = rng.randrange(len(data) + 1)
+        data[position:position] = [0xFF, 0xFF, 0xFD]
+    elif kind == "trailing_header":
+        # the stuffed byte directly precedes the CRC
+        data += [0xFF, 0xFF, 0xFD]
+    elif kind == "stuffed_header":
+        # a sequence that looks like an already stuffed header
+        position = rng.randrange(len(data) + 1)
+        data[position:position] = [0xFF, 0xFF, 0xFD, 0xFD]
+    elif kind == "all_ff":
+        data = [0xFF] * len(data)
+    return list(struct.pack("<I", sequence)) + data
+
+
+def corrupt(rng: random.Random, kind: str, packet: List[int]) -> List[int]:
+    packet = list(packet)
+    if kind == "bit_flip":
+        packet[rng.randrange(len(packet))] ^= 1 << rng.randrange(8)
+    elif kind == "truncation":
+        del packet[rng.randrange(1, len(packet)):]
+    elif kind == "length":
+        # a plausible length makes the parser wait for bytes that belong to the following packets
+        length = rng.randrange(len(packet) - 7 + 1, RXPACKET_MAX_LEN + 1)
+        packet[5] = DXL_LOBYTE(length)
+        packet[6] = DXL_HIBYTE(length)
+    elif kind == "spurious_header":
+        fake = [0xFF, 0xFF, 0xFD, 0x00, rng.randrange(0xFD), rng.randrange(256), rng.randrange(4), 0x55]
+        packet = fake[:rng.randrange(3, len(fake) + 1)] + packet
+    elif kind == "noise":
+        packet = [rng.randrange(256) for _ in range(rng.randrange(1, 32))] + packet
+    return packet
+
+
+def generate_stream(packets: int, corruption_rate: float, seed: int):
+    rng = random.Random(seed)
+    packet_handler = Protocol2PacketHandler()
+    stream = bytearray()
+    expected = []
+    for sequence in range(packets):
+        params = payload(rng, sequence)
+        packet = status_packet(packet_handler, rng.randrange(1, 0xFD), params)
+        unstuffed = packet_handler.removeStuffing(list(packet))
+        kind = rng.choice(CORRUPTIONS) if rng.random() < corruption_rate else None
+        start = len(stream)
+        corrupted = packet if kind is None else corrupt(rng, kind, packet)
+        stream += bytes(corrupted)
+        # insertions end where the intact packet starts
+        corruption_end = start + len(corrupted) - len(packet) if kind in INSERTIONS else len(stream)
+        expected.append(StreamPacket(sequence, unstuffed, len(stream), corruption_end, kind is None or kind in INSERTIONS,
+                                     kind))
+    return bytes(stream), expected
+
+
+class StreamPort:
+    """
+    Replays a byte stream at line rate on a virtual clock. Reading from the port returns the bytes that have arrived
+    until now and advances the clock to the next latency period if none have arrived.
+    """
+
+    def __init__(self, stream: bytes, baud_rate: int, latency: float):
+        self.ser = None
+        self.is_using = False
+        self.__stream = stream
+        self.__position = 0
+        self.__latency = latency
+        # 8 data bits, a start and a stop bit
+        self.__bytes_per_period = baud_rate / 10 * latency
+        self.__period = 0
+        self.__packet_start = 0
+        self.__timeout_periods = 0
+
+    def __available(self, period: int) -> int:
+        return min(len(self.__stream), int(period * self.__bytes_per_period + 1e-9))
+
+    def arrival(self, end: int) -> float:
+        """
+        :return: Time at which the stream up to the given offset is available to the host.
+        """
+        period = math.ceil(end / self.__bytes_per_period - 1e-9)
+        return period * self.__latency
+
+    def readPort(self, length: int) -> bytes:
+        available = self.__available(self.__period)
+        if available <= self.__position:
+            self.__period += 1
+            return b""
+        end = min(available, self.__position + length)
+        data = self.__stream[self.__position:end]
+        self.__position = end
+        return data
+
+    def setPacketTimeoutMillis(self, msec: float):
+        self.__packet_start = self.__period
+        self.__timeout_periods = max(1, math.ceil(msec / 1000 / self.__latency))
+
+    def isPacketTimeout(self) -> bool:
+        return self.__period - self.__packet_start > self.__timeout_periods
+
+    @property
+    def now(self) -> float:
+        return self.__period * self.__latency
+
+    @property
+    def exhausted(self) -> bool:
+        return self.__position == len(self.__stream)
+
+
+def run(name: str, packet_handler: Protocol2PacketHandler, stream: bytes, expected: List[StreamPacket], baud_rate: int,
+        latency: float, timeout_ms: float):
+    port = StreamPort(stream, baud_rate, latency)
+    by_sequence = {p.sequence: p for p in expected}
+    delivered = {}
+    false_accepts = 0
+    start = time.perf_counter()
+    while True:
+        port.setPacketTimeoutMillis(timeout_ms)
+        packet, result = packet_handler.rxPacket(port)
+        if result == COMM_SUCCESS:
+            sequence = struct.unpack("<I", bytes(packet[9:13]))[0] if len(packet) >= 13 else None
+            reference = by_sequence.get(sequence)
+            if reference is None or not reference.intact or reference.packet != packet or sequence in delivered:
+                false_accepts += 1
+            else:
+                delivered[sequence] = port.now
+        elif result == COMM_RX_TIMEOUT and port.exhausted:
+            break
+    duration = time.perf_counter() - start
+
+    intact = [p for p in expected if p.intact]
+    latencies = [delivered[p.sequence] - port.arrival(p.end) for p in intact if p.sequence in delivered]
+    # the recovery time of a corruption is the time from its arrival to the delivery of the first intact packet that
+    # follows it, intact packets dropped in between (while the parser resynchronises) are counted as lost
+    recoveries = []
+    lost_in_recovery = 0
+    corruption_time = None
+    for p in expected:
+        if p.corruption is not None and corruption_time is None:
+            corruption_time = port.arrival(p.corruption_end)
+        if corruption_time is None or not p.intact:
+            continue
+        if p.sequence in delivered:
+            recoveries.append(delivered[p.sequence] - corruption_time)
+            corruption_time = None
+        else:
+            lost_in_recovery += 1
+    resync_bytes = getattr(packet_handler, "resync_bytes", None)
+    print("{:<8} {:>10.0f} packets/s {:>6d}/{:<6d} intact delivered {:>4d} false accepts {:>8} resync bytes "
+          "{:>5d} lost in recovery, recovery mean {:>6.2f}ms worst {:>6.2f}ms, worst latency {:>6.2f}ms".format(
+              name, len(delivered) / duration, len(delivered), len(intact), false_accepts,
+              "-" if resync_bytes is None else resync_bytes, lost_in_recovery,
+              sum(recoveries) / max(1, len(recoveries)) * 1000, max(recoveries, default=0) * 1000,
+              max(latencies, default=0) * 1000))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--packets", type=int, default=20000)
+    parser.add_argument("-c", "--corruption-rate", type=float, default=0.05,
+                        help="Fraction of packets that are corrupted or preceded by garbage")
+    parser.add_argument("-b", "--baud-rate", type=int, default=2000000)
+    parser.add_argument("-l", "--latency", type=float, default=1.0, help="Latency timer of the adapter in ms")
+    parser.add_argument("-t", "--timeout", type=float, default=10.0, help="Packet timeout in ms")
+    parser.add_argument("-s", "--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    stream, expected = generate_stream(args.packets, args.corruption_rate, args.seed)
+    print("{} packets, {} bytes, {} corrupted".format(
+        len(expected), len(stream), sum(p.corruption is not None for p in expected)))
+    for name, packet_handler in [("sdk", Protocol2PacketHandler()), ("custom", CustomProtocol2PacketHandler())]:
+        run(name, packet_handler, stream, expected, args.baud_rate, args.latency / 1000, args.timeout)
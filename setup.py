@@ -14,14 +14,24 @@ setup(
     author_email="schneider@ias.informatik.tu-darmstadt.de",
     license="MIT",
     packages=["rhp12rn"],
+    python_requires=">=3.8",
     install_requires=[
+        "numpy",
         "dynamixel-sdk @ git+https://github.com/ROBOTIS-GIT/DynamixelSDK.git@c7e1eb71c911b87f7bdeda3c2c9e92276c2b4627#egg=dynamixel-sdk&subdirectory=python"
     ],
+    entry_points={
+        "console_scripts": [
+            "rhp12rn-server=rhp12rn.socket_server:main",
+            "rhp12rn-shm-server=rhp12rn.shared_memory_server:main",
+            "rhp12rn-monitor=rhp12rn.monitor:main",
+        ]
+    },
 
     classifiers=[
         "Intended Audience :: Science/Research",
         "License :: OSI Approved :: MIT License",
         "Operating System :: POSIX :: Linux",
-        "Programming Language :: Python :: 3.6",
+        "Programming Language :: Python :: 3",
+        "Programming Language :: Python :: 3.8",
     ],
 )
@@ -0,0 +1,36 @@
+"""
+MIT License
+
+Copyright (c) 2021 Tim Schneider
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from rhp12rn import RHP12RNAConnector, RetryPolicy
+
+
+def test_group_read_after_reopen(gripper):
+    gripper.control_table[580:584] = (1234).to_bytes(4, "little")
+    with RHP12RNAConnector(device=gripper.device, baud_rate=1000000, retry_policy=RetryPolicy()) as connector:
+        assert connector.group_read()["present_position"] == 1234
+        # losing the USB connection makes the next read reopen the port with a new port handler
+        connector._DynamixelConnector__port_handler.ser.close()
+        assert connector.read_field("present_position") == 1234
+        assert connector.retry_metrics.reopens == 1
+        assert connector.group_read()["present_position"] == 1234
@@ -0,0 +1,52 @@
+"""
+MIT License
+
+Copyright (c) 2021 Tim Schneider
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in all
+copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+SOFTWARE.
+"""
+
+from rhp12rn import RHP12RNAConnector
+from rhp12rn.monitor import TelemetryMonitor
+
+
+def test_monitor_counts_timeouts(gripper):
+    with RHP12RNAConnector(device=gripper.device, baud_rate=1000000) as connector:
+        connector.packet_timeout_ms = 5
+        monitor = TelemetryMonitor(connector, rate=0)
+        for _ in range(10):
+            monitor.step()
+        assert monitor.samples == 5 and monitor.errors == 0
+        # the gripper stops replying, each read times out
+        gripper._PtyGripper__reply = lambda *args, **kwargs: None
+        for _ in range(10):
+            monitor.step()
+        assert monitor.samples == 5 and monitor.errors == 5
+
+
+def test_monitor_counts_transmit_errors(gripper):
+    with RHP12RNAConnector(device=gripper.device, baud_rate=1000000) as connector:
+        monitor = TelemetryMonitor(connector, rate=0)
+        monitor.step()
+        monitor.step()
+        connector.disconnect()
+        # sending fails, which is counted instead of raised
+        for _ in range(3):
+            monitor.step()
+        assert monitor.samples == 1 and monitor.errors == 3